@@ -0,0 +1,179 @@
+import math
+import statistics
+import tracemalloc
+from base64 import b64encode
+from itertools import cycle
+from time import perf_counter
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from recipes.importers import make_demo_image
+from recipes.models import Ingredient, Recipe, Tag
+
+
+class Scenario:
+    """Сценарий нагрузочного теста: один запрос к API."""
+
+    def __init__(self, name, method, build, anonymous=False, rollback=False):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.anonymous = anonymous
+        self.rollback = rollback
+
+
+def recipe_payload(context):
+    return {
+        'name': 'Рецепт из нагрузочного теста',
+        'text': 'Описание',
+        'cooking_time': 30,
+        'tags': context['tags'][:1],
+        'ingredients': [
+            {'id': ingredient, 'amount': 100}
+            for ingredient in context['ingredients']
+        ],
+        'image': context['image'],
+    }
+
+
+SCENARIOS = (
+    Scenario(
+        'recipe_list_anonymous', 'get',
+        lambda context: ('/api/recipes/', {'limit': 6}),
+        anonymous=True,
+    ),
+    Scenario(
+        'recipe_list', 'get',
+        lambda context: ('/api/recipes/', {'limit': 6}),
+    ),
+    Scenario(
+        'recipe_list_filtered', 'get',
+        lambda context: ('/api/recipes/', {
+            'limit': 6, 'tags': context['tag_slug'], 'is_favorited': 1,
+        }),
+    ),
+    Scenario(
+        'recipe_detail', 'get',
+        lambda context: (f'/api/recipes/{next(context["recipes"])}/', {}),
+    ),
+    Scenario(
+        'subscriptions', 'get',
+        lambda context: ('/api/users/subscriptions/', {'recipes_limit': 3}),
+    ),
+    Scenario(
+        'download_shopping_cart', 'get',
+        lambda context: ('/api/recipes/download_shopping_cart/', {}),
+    ),
+    Scenario(
+        'recipe_create', 'post',
+        lambda context: ('/api/recipes/', recipe_payload(context)),
+        rollback=True,
+    ),
+)
+
+
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+def make_context(user, recipes_sample):
+    """Данные для сценариев: токен, выборка рецептов, теги, ингредиенты."""
+    image = make_demo_image(0).read()
+    return {
+        'token': Token.objects.get_or_create(user=user)[0].key,
+        'recipes': cycle(Recipe.objects.order_by(
+            '?'
+        ).values_list('id', flat=True)[:recipes_sample]),
+        'tag_slug': Tag.objects.values_list('slug', flat=True).first(),
+        'tags': list(Tag.objects.values_list('id', flat=True)),
+        'ingredients': list(
+            Ingredient.objects.values_list('id', flat=True)[:10]
+        ),
+        'image': f'data:image/jpeg;base64,{b64encode(image).decode()}',
+    }
+
+
+def send(client, scenario, context):
+    path, data = scenario.build(context)
+    if scenario.method == 'post':
+        response = client.post(path, data, content_type='application/json')
+    else:
+        response = client.get(path, data)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response.status_code
+
+
+def perform(client, scenario, context):
+    if not scenario.rollback:
+        return send(client, scenario, context)
+    with transaction.atomic():
+        status = send(client, scenario, context)
+        transaction.set_rollback(True)
+    return status
+
+
+def run_scenario(scenario, context, host, iterations, warmup,
+                 alloc_iterations):
+    """Задержки, число запросов к БД и пиковые выделения памяти."""
+    headers = {'HTTP_HOST': host}
+    if not scenario.anonymous:
+        headers['HTTP_AUTHORIZATION'] = f'Token {context["token"]}'
+    client = Client(**headers)
+    for _ in range(warmup):
+        perform(client, scenario, context)
+    timings, queries, statuses = [], [], set()
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = perf_counter()
+            statuses.add(perform(client, scenario, context))
+            timings.append((perf_counter() - started) * 1000)
+        queries.append(len(captured))
+    allocations = []
+    tracemalloc.start()
+    try:
+        for _ in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            perform(client, scenario, context)
+            allocations.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': sorted(statuses),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'mean_ms': round(statistics.mean(timings), 2),
+        'queries': max(queries),
+        'alloc_kib': (
+            round(statistics.median(allocations) / 1024, 1)
+            if allocations else None
+        ),
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Сравнение с сохраненными результатами; возвращает регрессии."""
+    rows, regressions = [], []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        change = (
+            (result['p95_ms'] - previous['p95_ms'])
+            / previous['p95_ms'] * 100
+            if previous['p95_ms'] else 0
+        )
+        rows.append((name, previous, result, change))
+        if result['queries'] > previous['queries']:
+            regressions.append(
+                f'{name}: запросов к БД {previous["queries"]} '
+                f'→ {result["queries"]}'
+            )
+        if max_regression is not None and change > max_regression:
+            regressions.append(f'{name}: p95 вырос на {change:.0f}%')
+    return rows, regressions
@@ -1,13 +1,29 @@
 from distutils.util import strtobool
+from django.db.models import Count, Exists, OuterRef
 from django_filters import (
-    AllValuesMultipleFilter,
+    CharFilter,
+    ChoiceFilter,
     FilterSet,
+    MultipleChoiceFilter,
     TypedChoiceFilter,
 )
 from rest_framework.filters import SearchFilter
 
-from core.constants import RECIPE_FILTER_CHOICES
+from core.constants import (
+    RECIPE_FILTER_CHOICES,
+    RECIPE_ORDERING_CHOICES,
+    RECIPE_ORDERINGS,
+    TAGS_MODE_ALL,
+    TAGS_MODE_CHOICES,
+)
+from recipes import reference
 from recipes.models import Recipe
+from recipes.search import search_recipes
+
+
+def tag_choices():
+    """Варианты фильтра по тегам берутся из справочника в памяти."""
+    return [(tag.slug, tag.slug) for tag in reference.tags.all()]
 
 
 class RecipeFilter(FilterSet):
@@ -21,7 +37,16 @@ class RecipeFilter(FilterSet):
         method='filter_is_in_shopping_cart',
         coerce=strtobool
     )
-    tags = AllValuesMultipleFilter(field_name='tags__slug', )
+    tags = MultipleChoiceFilter(choices=tag_choices, method='filter_tags')
+    tags_mode = ChoiceFilter(
+        choices=TAGS_MODE_CHOICES,
+        method='filter_tags_mode'
+    )
+    search = CharFilter(method='filter_search')
+    ordering = ChoiceFilter(
+        choices=RECIPE_ORDERING_CHOICES,
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -29,12 +54,40 @@ class RecipeFilter(FilterSet):
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorite_recipe__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shoppingcart_recipe__user=self.request.user)
+            return queryset.filter(is_in_shopping_cart=True)
+        return queryset
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты с любым (tags_mode=any) или всеми (all) тегами.
+
+        Слаги переводятся в id по справочнику в памяти, а отбор выполняется
+        одним подзапросом EXISTS к таблице связей без JOIN и DISTINCT.
+        """
+        slugs = set(value)
+        tag_ids = [tag.pk for tag in reference.tags.all() if tag.slug in slugs]
+        links = Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+        )
+        if self.form.cleaned_data.get('tags_mode') == TAGS_MODE_ALL:
+            links = links.values('recipe_id').annotate(
+                tags_count=Count('tag_id')
+            ).filter(tags_count=len(tag_ids))
+        return queryset.filter(Exists(links))
+
+    def filter_tags_mode(self, queryset, name, value):
+        """Режим учитывается в filter_tags."""
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
 
 
 class IngredientFilter(SearchFilter):
@@ -1,4 +1,16 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag, urlencode
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from core.cache import get_version
+from core.constants import VIEWER_VERSION
+from core.profiling import current_profile
 
 
 class ListRetrieveViewSet(
@@ -9,3 +21,181 @@ class ListRetrieveViewSet(
     """Миксин для класса тег и ингредиент."""
 
     pass
+
+
+class AnonymousCacheMixin:
+    """Миксин кэширования ответов list и retrieve для анонимов."""
+
+    cache_prefix = None
+    cache_version = None
+    cache_timeout = settings.RECIPES_CACHE_TIMEOUT
+
+    def get_cache_query_params(self):
+        params = set()
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            params.update(filterset_class.base_filters)
+        paginator = self.paginator
+        if paginator is not None:
+            params.update(
+                param for param in (
+                    getattr(paginator, 'page_query_param', None),
+                    getattr(paginator, 'page_size_query_param', None),
+                    getattr(paginator, 'cursor_query_param', None),
+                    getattr(paginator, 'count_query_param', None),
+                ) if param
+            )
+        return params
+
+    def get_cache_key(self, request):
+        allowed = self.get_cache_query_params()
+        query = urlencode(sorted(
+            (param, value)
+            for param, values in request.query_params.lists()
+            if param in allowed
+            for value in values
+        ))
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return ':'.join(str(part) for part in (
+            self.cache_prefix,
+            get_version(self.cache_version),
+            request.get_host(),
+            self.action,
+            lookup,
+            md5(query.encode()).hexdigest(),
+        ))
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+def get_query_string(request):
+    return urlencode(sorted(request.query_params.lists()), doseq=True)
+
+
+class ConditionalGetMixin:
+    """Миксин ответов 304 на If-None-Match и If-Modified-Since.
+
+    Валидаторы возвращает метод get_validators вьюсета: части ETag
+    и дату изменения (или None, если валидаторов нет). При совпадении
+    ответ отдается без сериализации. Last-Modified выставляется только
+    анонимам: изменения избранного и подписок по дате не отследить.
+    """
+
+    def get_viewer_version(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return None
+        return get_version(VIEWER_VERSION.format(user.pk))
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        parts, last_modified = validators
+        etag = quote_etag(md5(':'.join(str(part) for part in (
+            *parts,
+            request.get_host(),
+            request.accepted_media_type,
+        )).encode()).hexdigest())
+        timestamp = (
+            int(last_modified.timestamp())
+            if last_modified and not request.user.is_authenticated
+            else None
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ReferenceCacheMixin:
+    """Миксин, отдающий list и retrieve из справочника в памяти процесса."""
+
+    reference = None
+
+    def filter_reference(self, objects):
+        return objects
+
+    def get_validators(self):
+        """Для справочника достаточно версии всей таблицы."""
+        return (
+            self.reference.version,
+            self.kwargs.get(self.lookup_url_kwarg or self.lookup_field),
+            get_query_string(self.request),
+        ), None
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(
+            self.filter_reference(self.reference.all()), many=True
+        )
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        instance = self.reference.get(pk)
+        if instance is None:
+            raise Http404
+        return Response(self.get_serializer(instance).data)
+
+
+class QueryBudgetMixin:
+    """Миксин бюджетов запросов к БД для действий вьюсета.
+
+    Бюджет проверяет RequestProfileMiddleware; действия без бюджета
+    только попадают в журнал.
+    """
+
+    query_budgets = {}
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        profile = current_profile.get()
+        if profile is not None:
+            profile.start_view(
+                f'{type(self).__name__}.{self.action}',
+                self.query_budgets.get(self.action),
+            )
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        profile = current_profile.get()
+        if profile is not None:
+            profile.finish_view()
+        return super().finalize_response(request, response, *args, **kwargs)
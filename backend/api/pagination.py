@@ -1,8 +1,221 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from math import ceil
 
-from core.constants import PAGE_SIZE
+from django.conf import settings
+from django.core.paginator import (
+    EmptyPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    PageNumberPagination,
+    _reverse_ordering,
+)
+
+from core.constants import (
+    COUNT_MODE_ESTIMATE,
+    COUNT_MODE_EXACT,
+    COUNT_MODES,
+    CURSOR_ORDERING,
+    PAGE_SIZE,
+)
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по плану запроса PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+class LookaheadPage(Page):
+    """Страница, которая знает о следующей без подсчета всех строк."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class CountModePaginator(Paginator):
+    """Пагинатор с точным, оценочным или отключенным подсчетом строк."""
+
+    def __init__(self, *args, count_mode=COUNT_MODE_EXACT, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_mode = count_mode
+
+    @cached_property
+    def count(self):
+        if self.count_mode == COUNT_MODE_EXACT:
+            return super().count
+        if self.count_mode == COUNT_MODE_ESTIMATE:
+            return estimate_count(self.object_list)
+        return None
+
+    @cached_property
+    def num_pages(self):
+        if self.count_mode == COUNT_MODE_EXACT:
+            return super().num_pages
+        return max(1, ceil((self.count or 0) / self.per_page))
+
+    def page(self, number):
+        if self.count_mode == COUNT_MODE_EXACT:
+            return super().page(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if not object_list and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return LookaheadPage(
+            object_list[:self.per_page],
+            number,
+            self,
+            has_next=len(object_list) > self.per_page,
+        )
+
+
+class LimitCursorPagination(CursorPagination):
+    """Курсорная пагинация по ключу сортировки вьюсета.
+
+    К сортировке добавляется первичный ключ, а позиция курсора хранит
+    значения всех ее полей, поэтому следующая страница выбирается
+    условием по составному ключу без OFFSET даже при множестве равных
+    значений первого поля (например, нулевых счетчиков избранного).
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    ordering = CURSOR_ORDERING
+    unique_fields = ('pk', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, 'get_cursor_ordering'):
+            ordering = tuple(view.get_cursor_ordering())
+        else:
+            ordering = super().get_ordering(request, queryset, view)
+        if ordering[-1].lstrip('-') not in self.unique_fields:
+            ordering += ('-pk',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+        ordering = (
+            _reverse_ordering(self.ordering) if reverse else self.ordering
+        )
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(
+                ordering, self.decode_position(position)
+            ))
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = (
+            self._get_position_from_instance(results[-1], self.ordering)
+            if len(results) > len(self.page) else None
+        )
+        has_position = position is not None or offset > 0
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_position, bool(following)
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next, self.has_previous = bool(following), has_position
+            self.next_position, self.previous_position = following, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    @staticmethod
+    def get_keyset_filter(ordering, values):
+        """Строки после позиции: (a, b, c) > (x, y, z) по направлениям."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([
+            str(getattr(instance, field.lstrip('-'))) for field in ordering
+        ])
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size = PAGE_SIZE
     page_size_query_param = 'limit'
+    cursor_query_param = LimitCursorPagination.cursor_query_param
+    count_query_param = 'count'
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def get_count_mode(self, request):
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode in COUNT_MODES:
+            return count_mode
+        return settings.PAGINATION_COUNT_MODE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = LimitCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.count_mode = self.get_count_mode(request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def django_paginator_class(self, *args, **kwargs):
+        return CountModePaginator(*args, count_mode=self.count_mode, **kwargs)
@@ -1,9 +1,27 @@
-from django.db import transaction
+import base64
+import binascii
+import json
+from hashlib import sha256
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models, transaction
+from django.db.models import prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.utils import html
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework.validators import UniqueTogetherValidator
 
+from core.cache import get_versions
 from core.constants import (
+    COOKABLE_FIELDS,
+    COOKABLE_LIMIT,
+    COOKABLE_MAX_INGREDIENTS,
+    COOKABLE_MAX_LIMIT,
     ERROR_INGREDIENTS,
     ERROR_ME_FOLLOW,
     ERROR_MESSAGE_DUBLICATE_INGRED,
@@ -11,8 +29,15 @@ from core.constants import (
     ERROR_TAG,
     FOLLOWING_ERROR,
     IMAGE_ERROR,
+    IMAGE_RENDITION_FORMATS,
+    INGREDIENTS_VERSION,
     RECIPE_ADD_ERR0R,
+    RECIPE_FRAGMENT_PREFIX,
+    RECIPE_VERSION,
+    TAGS_VERSION,
+    USER_VERSION,
 )
+from recipes import reference
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -21,12 +46,271 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.shopping_list import (
+    batch_recipe_refreshes,
+    refresh_recipe_in_shopping_lists,
+)
 from users.models import Subscription, User
 
 
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Проверка первичного ключа по справочнику в памяти процесса.
+
+    Перед проверкой списка значений все ключи разрешаются одним вызовом
+    prefetch, чтобы промахи мимо справочника стоили один запрос IN.
+    """
+
+    def __init__(self, **kwargs):
+        self.reference = kwargs.pop('reference')
+        self.prefetched = None
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    @staticmethod
+    def to_pk(data):
+        if isinstance(data, bool):
+            raise TypeError
+        return int(data)
+
+    def prefetch(self, values):
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.to_pk(value))
+            except (TypeError, ValueError):
+                continue
+        self.prefetched = self.reference.get_many(pks)
+
+    def to_internal_value(self, data):
+        try:
+            pk = self.to_pk(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if self.prefetched is not None:
+            instance = self.prefetched.get(pk)
+        else:
+            instance = self.reference.get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, разрешаемый одним обращением.
+
+    В multipart/form-data ключи передаются повторяющимся полем
+    или одной строкой JSON.
+    """
+
+    def get_value(self, dictionary):
+        value = super().get_value(dictionary)
+        if (
+            html.is_html_input(dictionary)
+            and isinstance(value, list)
+            and len(value) == 1
+        ):
+            try:
+                parsed = json.loads(value[0])
+            except ValueError:
+                return value
+            if isinstance(parsed, list):
+                return parsed
+        return value
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        self.child_relation.prefetch(data)
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self.child_relation.prefetched = None
+
+
+class IngredientRecipeListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта с проверкой id одним обращением.
+
+    В multipart/form-data список передается строкой JSON
+    или полями вида ingredients[0]id.
+    """
+
+    def get_value(self, dictionary):
+        if html.is_html_input(dictionary) and self.field_name in dictionary:
+            value = dictionary[self.field_name]
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value
+        return super().get_value(dictionary)
+
+    def to_internal_value(self, data):
+        field = self.child.fields['id']
+        if isinstance(data, list):
+            field.prefetch(
+                item.get('id') for item in data if isinstance(item, dict)
+            )
+        try:
+            return super().to_internal_value(data)
+        finally:
+            field.prefetched = None
+
+
+class UploadImageField(Base64ImageField):
+    """Изображение строкой Base64 или файлом из multipart/form-data.
+
+    Загруженный файл не читается в память целиком: большие файлы Django
+    сохраняет во временный файл, откуда его и проверяет Pillow.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, UploadedFile):
+            return super().to_internal_value(data)
+        image = serializers.ImageField.to_internal_value(self, data)
+        extension = image.image.format.lower()
+        if extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        if extension == 'jpeg':
+            extension = 'jpg'
+        image.name = f'{self.get_file_name(None)}.{extension}'
+        return image
+
+
+class HashedImageField(UploadImageField):
+    """Изображение, которое не декодируется повторно.
+
+    Если содержимое совпадает с уже сохраненным изображением объекта,
+    возвращается существующий файл без проверки и перезаписи.
+    """
+
+    def get_content_hash(self, data):
+        digest = sha256()
+        if isinstance(data, UploadedFile):
+            for chunk in data.chunks():
+                digest.update(chunk)
+            data.seek(0)
+            return digest.hexdigest()
+        if not isinstance(data, str) or not data:
+            return None
+        try:
+            digest.update(base64.b64decode(data.split(';base64,')[-1]))
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        return digest.hexdigest()
+
+    def to_internal_value(self, data):
+        content_hash = self.get_content_hash(data)
+        if content_hash is None:
+            return super().to_internal_value(data)
+        instance = getattr(self.parent, 'instance', None)
+        if (
+            instance is not None
+            and instance.image
+            and instance.image_hash == content_hash
+        ):
+            return instance.image
+        image = super().to_internal_value(data)
+        image.content_hash = content_hash
+        return image
+
+
+class RenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения с их размерами."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        representation = {}
+        for name, rendition in value.items():
+            if name == 'source':
+                continue
+            representation[name] = {
+                key: (
+                    self.build_url(request, item)
+                    if key in IMAGE_RENDITION_FORMATS else item
+                )
+                for key, item in rendition.items()
+            }
+        return representation
+
+    @staticmethod
+    def build_url(request, name):
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+
+class RecipeFragmentListSerializer(serializers.ListSerializer):
+    """Список рецептов с пакетным чтением фрагментов из кэша."""
+
+    def to_representation(self, data):
+        if isinstance(data, models.manager.BaseManager):
+            data = data.all()
+        return self.child.to_representation_many(list(data))
+
+
+class RecipeFragmentMixin:
+    """Кэширование не зависящей от пользователя части рецепта."""
+
+    fragment_kind = None
+    fragment_timeout = settings.RECIPES_CACHE_TIMEOUT
+
+    def get_fragment_versions(self, recipe):
+        return (RECIPE_VERSION.format(recipe.pk),)
+
+    def get_fragment_keys(self, recipes):
+        names = {
+            recipe.pk: self.get_fragment_versions(recipe)
+            for recipe in recipes
+        }
+        versions = get_versions(set(chain.from_iterable(names.values())))
+        request = self.context.get('request')
+        host = request.get_host() if request else ''
+        return {
+            pk: ':'.join(str(part) for part in (
+                RECIPE_FRAGMENT_PREFIX,
+                self.fragment_kind,
+                host,
+                pk,
+                *(versions[name] for name in recipe_names),
+            ))
+            for pk, recipe_names in names.items()
+        }
+
+    def strip_user_data(self, data):
+        return data
+
+    def add_user_data(self, recipe, data):
+        return data
+
+    def to_representation(self, instance):
+        return self.to_representation_many([instance])[0]
+
+    def to_representation_many(self, recipes):
+        keys = self.get_fragment_keys(recipes)
+        fragments = cache.get_many(keys.values())
+        result, missing = [], {}
+        for recipe in recipes:
+            key = keys[recipe.pk]
+            data = fragments.get(key)
+            if data is None:
+                data = super().to_representation(recipe)
+                missing[key] = self.strip_user_data(data)
+            else:
+                data = self.add_user_data(recipe, data)
+            result.append(data)
+        if missing:
+            cache.set_many(missing, self.fragment_timeout)
+        return result
+
+
 class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления аватара."""
-    avatar = Base64ImageField()
+    avatar = UploadImageField()
 
     class Meta:
         model = User
@@ -36,6 +320,7 @@ class AvatarSerializer(serializers.ModelSerializer):
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор для модели User."""
     is_subscribed = serializers.SerializerMethodField()
+    avatar_renditions = RenditionsField()
 
     class Meta:
         model = User
@@ -47,9 +332,12 @@ class UserSerializer(serializers.ModelSerializer):
             'last_name',
             'is_subscribed',
             'avatar',
+            'avatar_renditions',
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return bool(
             request
@@ -81,8 +369,9 @@ class IngredientSerializer(serializers.ModelSerializer):
 
 class IngredientRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для указания количества ингредиента в рецепте."""
-    id = serializers.PrimaryKeyRelatedField(
+    id = CachedPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(),
+        reference=reference.ingredients,
         source='name'
     )
     name = serializers.CharField(
@@ -97,10 +386,12 @@ class IngredientRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = IngredientRecipe
         fields = ('id', 'name', 'measurement_unit', 'amount',)
+        list_serializer_class = IngredientRecipeListSerializer
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(RecipeFragmentMixin, serializers.ModelSerializer):
     """Сериализатор для просмотра рецептов."""
+    fragment_kind = 'full'
     tags = TagSerializer(many=True, )
     author = UserSerializer()
     ingredients = IngredientRecipeSerializer(
@@ -110,6 +401,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Recipe
@@ -122,11 +414,39 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_renditions',
             'text',
             'cooking_time',
         )
+        list_serializer_class = RecipeFragmentListSerializer
+
+    def get_fragment_versions(self, recipe):
+        return (
+            RECIPE_VERSION.format(recipe.pk),
+            USER_VERSION.format(recipe.author_id),
+            TAGS_VERSION,
+            INGREDIENTS_VERSION,
+        )
 
-    def check_recipe_in_model(self, obj, model):
+    def strip_user_data(self, data):
+        return {
+            **data,
+            'author': {**data['author'], 'is_subscribed': False},
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+        }
+
+    def add_user_data(self, recipe, data):
+        data['author']['is_subscribed'] = (
+            self.fields['author'].get_is_subscribed(recipe.author)
+        )
+        data['is_favorited'] = self.get_is_favorited(recipe)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(recipe)
+        return data
+
+    def check_recipe_in_model(self, obj, model, annotation):
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
         request = self.context.get('request')
         return bool(
             request
@@ -138,20 +458,23 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, obj):
-        return self.check_recipe_in_model(obj, Favorite)
+        return self.check_recipe_in_model(obj, Favorite, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
-        return self.check_recipe_in_model(obj, ShoppingCart)
+        return self.check_recipe_in_model(
+            obj, ShoppingCart, 'is_in_shopping_cart'
+        )
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для создания и изменения рецептов."""
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = CachedPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all(),
+        reference=reference.tags,
     )
     ingredients = IngredientRecipeSerializer(many=True, )
-    image = Base64ImageField()
+    image = HashedImageField()
     author = serializers.HiddenField(
         default=serializers.CurrentUserDefault(),
     )
@@ -208,11 +531,57 @@ class RecipeSerializer(serializers.ModelSerializer):
             all_ingredients.append(ingredient_in_recipe)
         IngredientRecipe.objects.bulk_create(all_ingredients)
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Изменяет только отличающиеся строки ингредиентов рецепта.
+
+        Возвращает ингредиенты, которые добавлены или изменили
+        количество: bulk_create и bulk_update сигналов не отправляют.
+        Удаленные строки обрабатываются сигналами post_delete, пересчеты
+        списков покупок из них update() объединяет в один.
+        """
+        current = {
+            row.name_id: row
+            for row in IngredientRecipe.objects.filter(recipe=recipe)
+        }
+        amounts = {
+            ingredient['name'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            IngredientRecipe.objects.filter(
+                pk__in=[current[ingredient].pk for ingredient in removed]
+            ).delete()
+        changed = []
+        for ingredient, row in current.items():
+            amount = amounts.get(ingredient)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        added = amounts.keys() - current.keys()
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
+                name_id=ingredient, recipe=recipe, amount=amounts[ingredient]
+            )
+            for ingredient in added
+        )
+        return added | {row.name_id for row in changed}
+
+    @staticmethod
+    def set_image_hash(validated_data):
+        content_hash = getattr(validated_data.get('image'), 'content_hash', '')
+        if content_hash:
+            validated_data['image_hash'] = content_hash
+
     @transaction.atomic
     def create(self, validated_data):
         self.is_valid(raise_exception=True)
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
+        self.set_image_hash(validated_data)
         recipe = Recipe.objects.create(**validated_data)
         self.add_tags_and_ingredients_to_recipe(recipe, tags, ingredients)
         return recipe
@@ -222,21 +591,31 @@ class RecipeSerializer(serializers.ModelSerializer):
         self.is_valid(raise_exception=True)
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        new_image = validated_data.get('image', None)
-        if new_image and instance.image and instance.image != new_image:
-            instance.image.delete(save=False)
-        instance.tags.clear()
-        instance.ingredients.clear()
-        self.add_tags_and_ingredients_to_recipe(instance, tags, ingredients)
+        self.set_image_hash(validated_data)
+        instance.tags.set(tags)
+        with batch_recipe_refreshes():
+            refresh_recipe_in_shopping_lists(
+                instance, self.update_ingredients(instance, ingredients)
+            )
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            models.Prefetch(
+                'ingredient_recipe',
+                queryset=IngredientRecipe.objects.select_related('name'),
+            ),
+        )
         context = {'request': self.context.get('request')}
         return RecipeReadSerializer(instance, context=context).data
 
 
-class RecipeInformation(serializers.ModelSerializer):
+class RecipeInformation(RecipeFragmentMixin, serializers.ModelSerializer):
     """Сериализатор краткой информации о рецепте."""
+    fragment_kind = 'short'
+    image_renditions = RenditionsField()
 
     class Meta:
         model = Recipe
@@ -244,6 +623,7 @@ class RecipeInformation(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_renditions',
             'cooking_time',
         )
         read_only_fields = (
@@ -251,6 +631,46 @@ class RecipeInformation(serializers.ModelSerializer):
             'image',
             'cooking_time',
         )
+        list_serializer_class = RecipeFragmentListSerializer
+
+
+class CookableRecipeSerializer(RecipeInformation):
+    """Рецепт с долей ингредиентов, имеющихся у пользователя.
+
+    Делит с RecipeInformation фрагменты вида short: поля покрытия зависят
+    от запроса, поэтому перед записью в кэш они отбрасываются, и фрагмент
+    совпадает с краткой информацией о рецепте.
+    """
+    coverage = serializers.FloatField(read_only=True)
+    matched = serializers.IntegerField(read_only=True)
+    total = serializers.IntegerField(read_only=True)
+
+    class Meta(RecipeInformation.Meta):
+        fields = RecipeInformation.Meta.fields + COOKABLE_FIELDS
+
+    def strip_user_data(self, data):
+        return {
+            field: value for field, value in data.items()
+            if field not in COOKABLE_FIELDS
+        }
+
+    def add_user_data(self, recipe, data):
+        return {
+            **data,
+            **{field: getattr(recipe, field) for field in COOKABLE_FIELDS},
+        }
+
+
+class CookableQuerySerializer(serializers.Serializer):
+    """Параметры поиска рецептов по имеющимся ингредиентам."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        min_length=1,
+        max_length=COOKABLE_MAX_INGREDIENTS,
+    )
+    limit = serializers.IntegerField(
+        min_value=1, max_value=COOKABLE_MAX_LIMIT, default=COOKABLE_LIMIT
+    )
 
 
 class ShoppingFavoriteSerializer(serializers.ModelSerializer):
@@ -294,29 +714,38 @@ class FavoriteSerializer(ShoppingFavoriteSerializer):
         )
 
 
+def get_recipes_limit(request):
+    """Ограничение числа рецептов автора из параметра recipes_limit."""
+    try:
+        recipes_limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
 class SubscriptionSerializer(UserSerializer):
     """Сериализатор для подписок."""
     recipes = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
-        fields = UserSerializer.Meta.fields + ('recipes',)
+        fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count',)
         read_only_fields = (
             'email',
             'username',
             'first_name',
             'last_name',
-            'avatar'
+            'avatar',
+            'recipes_count',
         )
 
     def get_recipes(self, obj):
-        recipes = obj.recipes.all()
-        recipes_limit = self.context.get(
-            'request').query_params.get('recipes_limit')
-        if recipes_limit:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        if hasattr(obj, 'recipes_preview'):
+            recipes = obj.recipes_preview
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return RecipeInformation(recipes, many=True).data
 
 
@@ -0,0 +1,121 @@
+import csv
+import os
+from io import BytesIO
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import F
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from core.constants import (
+    MEASUREMENT_UNIT_CONVERSIONS,
+    NO_CONTENT,
+    SHOPPING_CART_CSV_HEADER,
+    SHOPPING_CART_TITLE,
+)
+from recipes.models import ShoppingListItem
+
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_FALLBACK_FONT = 'Helvetica'
+PDF_FONT_SIZE = 12
+PDF_LINE_HEIGHT = 0.7 * cm
+PDF_MARGIN = 2 * cm
+
+
+def get_shopping_list(user):
+    """Список покупок одним индексированным чтением.
+
+    Строки отсортированы по названию, единицы измерения приведены
+    к базовым, поэтому одинаковые продукты в кг и г складываются.
+    """
+    rows = ShoppingListItem.objects.filter(
+        user=user
+    ).values(
+        'amount',
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+    ).order_by(
+        'name',
+        'measurement_unit',
+    ).iterator()
+    for name, group in groupby(rows, key=itemgetter('name')):
+        totals = {}
+        for row in group:
+            unit, ratio = MEASUREMENT_UNIT_CONVERSIONS.get(
+                row['measurement_unit'],
+                (row['measurement_unit'], 1)
+            )
+            totals[unit] = totals.get(unit, 0) + row['amount'] * ratio
+        for unit in sorted(totals):
+            yield name, unit, totals[unit]
+
+
+def render_txt(items):
+    empty = True
+    for name, unit, amount in items:
+        empty = False
+        yield f'• {name} ({unit}) — {amount}\n'
+    if empty:
+        yield NO_CONTENT
+
+
+class _Echo:
+    """Псевдо-файл для потоковой записи csv."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(items):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(SHOPPING_CART_CSV_HEADER)
+    for item in items:
+        yield writer.writerow(item)
+
+
+def get_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.SHOPPING_CART_PDF_FONT):
+        return PDF_FALLBACK_FONT
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, settings.SHOPPING_CART_PDF_FONT)
+    )
+    return PDF_FONT_NAME
+
+
+def render_pdf(items):
+    """PDF целиком в памяти.
+
+    ReportLab пишет документ только в ``save()``: таблицу ссылок
+    и страницы нельзя отдать до конца списка, поэтому PDF отдается
+    обычным ответом, а не потоковым.
+    """
+    font = get_pdf_font()
+    width, height = A4
+    file = BytesIO()
+    pdf = canvas.Canvas(file, pagesize=A4)
+    pdf.setTitle(SHOPPING_CART_TITLE)
+    pdf.setFont(font, PDF_FONT_SIZE)
+    y = height - PDF_MARGIN
+    for line in render_txt(items):
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, line.rstrip('\n'))
+        y -= PDF_LINE_HEIGHT
+    pdf.save()
+    return file.getvalue()
+
+
+SHOPPING_CART_EXPORTS = {
+    'txt': render_txt,
+    'csv': render_csv,
+    'pdf': render_pdf,
+}
@@ -0,0 +1,93 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+
+def image_data(color='red'):
+    """Картинка PNG в виде data URI, как ее присылает фронтенд."""
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'PNG')
+    return (
+        'data:image/png;base64,'
+        + base64.b64encode(buffer.getvalue()).decode()
+    )
+
+
+class FoodgramTestCase(APITestCase):
+    """Общие данные тестов API: теги, ингредиенты и пользователи.
+
+    Медиафайлы пишутся во временный каталог, кэш очищается перед каждым
+    тестом, чтобы версии и закэшированные ответы не переходили между ними.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'Тег {number}', slug=f'tag{number}')
+            for number in range(3)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г')
+            for name in ('картофель', 'морковь', 'лук', 'сыр', 'молоко')
+        )
+        cls.user = cls.create_user('cook')
+        cls.other = cls.create_user('reader')
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com',
+            username=username,
+            first_name=username,
+            last_name=username,
+            password='Secret-password-1',
+        )
+
+    @staticmethod
+    def create_recipe(author, name, tags=(), ingredients=(), text='Текст'):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text=text,
+            cooking_time=10,
+            image='recipes/images/test.png',
+        )
+        recipe.tags.set(tags)
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, name=ingredient, amount=100)
+            for ingredient in ingredients
+        )
+        return recipe
+
+    def authorized(self, user):
+        client = self.client_class()
+        client.force_authenticate(user)
+        return client
+
+    def anonymous(self):
+        return self.client_class()
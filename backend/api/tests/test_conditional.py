@@ -0,0 +1,134 @@
+from django.utils.http import http_date
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Favorite
+from recipes.trending import update_trending_scores
+
+
+class ConditionalGetTest(FoodgramTestCase):
+    """Ответы 304 только пока данные выдачи не изменились."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.first = cls.create_recipe(
+            cls.user, 'Первый', cls.tags[:1], cls.ingredients[:2]
+        )
+        cls.second = cls.create_recipe(
+            cls.user, 'Второй', cls.tags[:1], cls.ingredients[:2]
+        )
+
+    def get(self, client, path, etag=None, **params):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return client.get(path, params, **headers)
+
+    def write(self, method, path, data=None, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.authorized(user or self.other), method)(
+                path, data, format='json'
+            )
+        self.assertLess(response.status_code, 400, response.content)
+
+    def assert_not_modified(self, client, path, etag, **params):
+        response = self.get(client, path, etag, **params)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.content)
+
+    def test_recipe_detail(self):
+        for client in (self.anonymous(), self.authorized(self.other)):
+            path = f'/api/recipes/{self.first.pk}/'
+            etag = self.get(client, path)['ETag']
+            self.assert_not_modified(client, path, etag)
+            self.write(
+                'patch',
+                path,
+                {
+                    'name': f'Первый {etag}',
+                    'text': 'Новый текст',
+                    'cooking_time': 15,
+                    'tags': [self.tags[0].pk],
+                    'ingredients': [
+                        {'id': self.ingredients[0].pk, 'amount': 5}
+                    ],
+                },
+                user=self.user,
+            )
+            response = self.get(client, path, etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_viewer_changes_own_list(self):
+        client = self.authorized(self.other)
+        etag = self.get(client, '/api/recipes/')['ETag']
+        self.assert_not_modified(client, '/api/recipes/', etag)
+        self.write('post', f'/api/recipes/{self.first.pk}/favorite/')
+        self.assertEqual(
+            self.get(client, '/api/recipes/', etag).status_code, 200
+        )
+
+    def test_popular_order_follows_favorites(self):
+        client = self.anonymous()
+        response = self.get(client, '/api/recipes/', ordering='popular')
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        self.assert_not_modified(
+            client, '/api/recipes/', etag, ordering='popular'
+        )
+        default_etag = self.get(client, '/api/recipes/')['ETag']
+        top = response.json()['results'][-1]['id']
+        self.write('post', f'/api/recipes/{top}/favorite/')
+        response = self.get(client, '/api/recipes/', etag, ordering='popular')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['id'], top)
+        self.assert_not_modified(client, '/api/recipes/', default_etag)
+
+    def test_reference_tables(self):
+        client = self.anonymous()
+        for path in ('/api/tags/', '/api/ingredients/'):
+            with self.subTest(path=path):
+                etag = self.get(client, path)['ETag']
+                self.assert_not_modified(client, path, etag)
+
+    def assert_list_modified(self, client, etag, last_modified, **params):
+        for headers in (
+            {'HTTP_IF_NONE_MATCH': etag},
+            {'HTTP_IF_MODIFIED_SINCE': last_modified},
+        ):
+            with self.subTest(headers=headers):
+                response = client.get('/api/recipes/', params, **headers)
+                self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_list_without_last_modified(self):
+        client = self.anonymous()
+        response = self.get(client, '/api/recipes/')
+        self.assertNotIn('Last-Modified', response)
+        # Дата изменения оставшихся рецептов при удалении не меняется.
+        last_modified = http_date(self.second.updated_at.timestamp() + 1)
+        self.write(
+            'delete', f'/api/recipes/{self.second.pk}/', user=self.user
+        )
+        self.assertEqual(
+            self.assert_list_modified(
+                client, response['ETag'], last_modified
+            ),
+            [self.first.pk],
+        )
+
+    def test_trending_order_follows_scores(self):
+        client = self.anonymous()
+        response = self.get(client, '/api/recipes/', ordering='trending')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.second.pk, self.first.pk],
+        )
+        last_modified = http_date(self.second.updated_at.timestamp() + 1)
+        Favorite.objects.create(user=self.other, recipe=self.first)
+        with self.captureOnCommitCallbacks(execute=True):
+            update_trending_scores()
+        self.assertEqual(
+            self.assert_list_modified(
+                client, response['ETag'], last_modified, ordering='trending'
+            ),
+            [self.first.pk, self.second.pk],
+        )
@@ -0,0 +1,110 @@
+from time import monotonic
+from unittest import mock
+
+from django.conf import settings
+
+from api.tests.base import FoodgramTestCase
+from recipes import cookable
+
+
+class WhatCanICookTest(FoodgramTestCase):
+    """Подбор рецептов по имеющимся ингредиентам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.pair = cls.create_recipe(
+            cls.user, 'Пара', ingredients=cls.ingredients[:2]
+        )
+        cls.four = cls.create_recipe(
+            cls.user, 'Четыре', ingredients=cls.ingredients[:4]
+        )
+        cls.single = cls.create_recipe(
+            cls.user, 'Один', ingredients=cls.ingredients[4:]
+        )
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            cookable, 'cookable_index', cookable.CookableIndex()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cook(self, ingredients, **params):
+        return self.anonymous().get('/api/recipes/what-can-i-cook/', {
+            'ingredients': ','.join(
+                str(ingredient.pk) for ingredient in ingredients
+            ),
+            **params,
+        })
+
+    def ranking(self, ingredients, **params):
+        response = self.cook(ingredients, **params)
+        self.assertEqual(response.status_code, 200)
+        return [
+            (recipe['id'], recipe['coverage'], recipe['matched'],
+             recipe['total'])
+            for recipe in response.json()
+        ]
+
+    def test_ranking_by_coverage(self):
+        self.assertEqual(self.ranking(self.ingredients[:2]), [
+            (self.pair.pk, 1.0, 2, 2),
+            (self.four.pk, 0.5, 2, 4),
+        ])
+        self.assertEqual(
+            self.ranking(self.ingredients[:2], limit=1),
+            [(self.pair.pk, 1.0, 2, 2)],
+        )
+
+    def test_warm_request_costs_one_query(self):
+        self.cook(self.ingredients[:1])
+        with self.assertNumQueries(1):
+            self.cook(self.ingredients[:1])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.cook([]).status_code, 400)
+        self.assertEqual(
+            self.cook(self.ingredients[:1], limit=0).status_code, 400
+        )
+
+    def test_changes_are_picked_up(self):
+        self.ranking(self.ingredients[4:])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.single.delete()
+            added = self.create_recipe(
+                self.user, 'Новый', ingredients=self.ingredients[3:]
+            )
+        self.assertEqual(
+            self.ranking(self.ingredients[4:]), [(added.pk, 0.5, 1, 2)]
+        )
+
+    def test_change_from_other_process_is_picked_up(self):
+        self.ranking(self.ingredients[4:])
+        # Без on_commit версия рецептов в кэше не меняется, как при записи
+        # из процесса с отдельным LocMemCache.
+        added = self.create_recipe(
+            self.user, 'Новый', ingredients=self.ingredients[4:]
+        )
+        self.assertEqual(len(self.ranking(self.ingredients[4:])), 1)
+        later = monotonic() + settings.COOKABLE_INDEX_MAX_AGE + 1
+        with mock.patch.object(cookable, 'monotonic', return_value=later):
+            self.assertCountEqual(
+                [row[0] for row in self.ranking(self.ingredients[4:])],
+                [self.single.pk, added.pk],
+            )
+
+    def test_shares_short_fragment(self):
+        self.ranking(self.ingredients[:2])
+        response = self.authorized(self.other).post(
+            f'/api/recipes/{self.pair.pk}/favorite/'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            set(response.json()),
+            {'id', 'name', 'image', 'image_renditions', 'cooking_time'},
+        )
+        self.assertEqual(
+            self.ranking(self.ingredients[:2])[0], (self.pair.pk, 1.0, 2, 2)
+        )
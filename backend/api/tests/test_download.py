@@ -0,0 +1,43 @@
+from api.tests.base import FoodgramTestCase
+from recipes.models import ShoppingCart
+
+
+class ShoppingCartDownloadTest(FoodgramTestCase):
+    """Текстовые форматы отдаются потоком, PDF - обычным ответом."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        recipe = cls.create_recipe(
+            cls.user, 'Пюре', ingredients=cls.ingredients[:2]
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def download(self, export_format):
+        response = self.authorized(self.user).get(
+            '/api/recipes/download_shopping_cart/',
+            {'format': export_format},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_text_formats_are_streamed(self):
+        for export_format, line in (
+            ('txt', 'картофель'),
+            ('csv', 'Ингредиент'),
+        ):
+            with self.subTest(format=export_format):
+                response = self.download(export_format)
+                self.assertTrue(response.streaming)
+                self.assertIn(
+                    line, b''.join(response.streaming_content).decode()
+                )
+
+    def test_pdf_is_plain_response(self):
+        response = self.download('pdf')
+        self.assertFalse(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertEqual(
+            int(response['Content-Length']), len(response.content)
+        )
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import FoodgramTestCase
+
+
+class CursorPaginationTest(FoodgramTestCase):
+    """Курсорная пагинация по сортировкам с повторяющимися значениями."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipes = [
+            cls.create_recipe(cls.user, f'Рецепт {number}')
+            for number in range(7)
+        ]
+
+    def walk(self, params):
+        """Проходит все страницы вперед и возвращает id рецептов."""
+        client = self.anonymous()
+        response = client.get('/api/recipes/', {**params, 'cursor': ''})
+        pages = [response.json()]
+        while pages[-1]['next']:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(pages[-1]['next'])
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(
+                'OFFSET' in query['sql'] for query in context.captured_queries
+            ))
+            pages.append(response.json())
+        return pages, [
+            recipe['id'] for page in pages for recipe in page['results']
+        ]
+
+    def test_ties_are_paged_by_primary_key(self):
+        for ordering in ('popular', 'trending', 'cooking_time', '-pub_date'):
+            with self.subTest(ordering=ordering):
+                pages, ids = self.walk({'ordering': ordering, 'limit': 2})
+                self.assertEqual(len(pages), 4)
+                self.assertEqual(len(ids), len(set(ids)))
+                self.assertCountEqual(
+                    ids, [recipe.pk for recipe in self.recipes]
+                )
+
+    def test_previous_link_returns_same_page(self):
+        pages, _ = self.walk({'ordering': 'popular', 'limit': 3})
+        response = self.anonymous().get(pages[-1]['previous'])
+        self.assertEqual(response.json()['results'], pages[-2]['results'])
+
+    def test_search_rejects_cursor(self):
+        response = self.anonymous().get(
+            '/api/recipes/', {'search': 'Рецепт', 'cursor': ''}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.json())
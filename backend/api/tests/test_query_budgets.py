@@ -0,0 +1,149 @@
+import logging
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api.tests.base import FoodgramTestCase, image_data
+from api.views import RecipeViewSet
+from core.profiling import QueryBudgetExceeded, RequestProfile
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+
+class ProfileHandler(logging.Handler):
+    """Собирает замеры RequestProfileMiddleware из журнала."""
+
+    def __init__(self):
+        super().__init__()
+        self.profiles = []
+
+    def emit(self, record):
+        if hasattr(record, 'profile'):
+            self.profiles.append(record.profile)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTest(FoodgramTestCase):
+    """Обычные запросы укладываются в бюджеты действий вьюсетов.
+
+    В строгом режиме превышение бюджета вызывает QueryBudgetExceeded,
+    и тест падает.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        cls.recipes = [
+            cls.create_recipe(
+                cls.author,
+                f'Рецепт {number}',
+                tags=cls.tags[:2],
+                ingredients=cls.ingredients[number % 2:number % 2 + 3],
+            )
+            for number in range(4)
+        ]
+        cls.own_recipe = cls.create_recipe(
+            cls.user, 'Свой рецепт', cls.tags[:1], cls.ingredients[:2]
+        )
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[1])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        Subscription.objects.create(user=cls.user, following=cls.author)
+
+    def setUp(self):
+        super().setUp()
+        self.handler = ProfileHandler()
+        logger = logging.getLogger('foodgram.profile')
+        patcher = mock.patch.object(logger, 'handlers', [self.handler])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(logger.setLevel, logger.level)
+        logger.setLevel(logging.INFO)
+
+    def request(self, client, method, path, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(client, method)(path, data, format='json')
+            content = (
+                b''.join(response.streaming_content)
+                if response.streaming else response.content
+            )
+        self.assertLess(response.status_code, 400, content)
+        return self.handler.profiles[-1]
+
+    def test_actions_fit_budgets(self):
+        recipe = self.recipes[0]
+        reader = self.authorized(self.user)
+        body = {
+            'name': 'Новый рецепт',
+            'text': 'Текст',
+            'cooking_time': 5,
+            'image': image_data(),
+            'tags': [self.tags[0].pk],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 10}
+                for ingredient in self.ingredients
+            ],
+        }
+        requests = (
+            ('get', '/api/tags/'),
+            ('get', f'/api/tags/{self.tags[0].pk}/'),
+            ('get', '/api/ingredients/', {'name': 'мо'}),
+            ('get', f'/api/ingredients/{self.ingredients[0].pk}/'),
+            ('get', '/api/ingredients/autocomplete/', {'name': 'мо'}),
+            ('get', '/api/users/'),
+            ('get', f'/api/users/{self.author.pk}/'),
+            ('get', '/api/users/me/'),
+            ('get', '/api/users/subscriptions/', {'recipes_limit': 2}),
+            ('post', f'/api/users/{self.other.pk}/subscribe/'),
+            ('delete', f'/api/users/{self.other.pk}/subscribe/'),
+            ('put', '/api/users/me/avatar/', {'avatar': image_data()}),
+            ('delete', '/api/users/me/avatar/'),
+            ('get', '/api/recipes/'),
+            ('get', '/api/recipes/', {'tags': 'tag0', 'is_favorited': 1}),
+            ('get', f'/api/recipes/{recipe.pk}/'),
+            ('get', f'/api/recipes/{recipe.pk}/get-link/'),
+            ('post', f'/api/recipes/{recipe.pk}/favorite/'),
+            ('delete', f'/api/recipes/{recipe.pk}/favorite/'),
+            ('post', f'/api/recipes/{recipe.pk}/shopping_cart/'),
+            ('delete', f'/api/recipes/{recipe.pk}/shopping_cart/'),
+            ('get', '/api/recipes/download_shopping_cart/'),
+            ('get', '/api/recipes/what-can-i-cook/', {
+                'ingredients': f'{self.ingredients[0].pk}',
+            }),
+            ('post', '/api/recipes/', body),
+            ('patch', f'/api/recipes/{self.own_recipe.pk}/', body),
+            ('delete', f'/api/recipes/{self.own_recipe.pk}/'),
+        )
+        for method, path, *data in requests:
+            with self.subTest(method=method, path=path):
+                self.request(reader, method, path, *data)
+        for method, path, *data in requests[:7]:
+            with self.subTest(method=method, path=path, anonymous=True):
+                self.request(self.anonymous(), method, path, *data)
+
+    def test_streamed_queries_are_counted(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipes[0])
+        with mock.patch.dict(
+            RecipeViewSet.query_budgets, {'download_shopping_cart': 0}
+        ):
+            response = self.authorized(self.user).get(
+                '/api/recipes/download_shopping_cart/'
+            )
+            with self.assertRaises(QueryBudgetExceeded):
+                b''.join(response.streaming_content)
+
+
+class RequestProfileTest(SimpleTestCase):
+    """Команды транзакций не входят в число запросов."""
+
+    def test_transaction_statements_are_not_counted(self):
+        profile = RequestProfile()
+        for sql in (
+            'BEGIN',
+            'SAVEPOINT "s1_x1"',
+            'RELEASE SAVEPOINT "s1_x1"',
+            'ROLLBACK TO SAVEPOINT "s1_x1"',
+            'SELECT 1',
+        ):
+            profile(lambda *args: None, sql, (), False, {})
+        self.assertEqual(profile.queries, 1)
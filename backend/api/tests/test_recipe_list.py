@@ -0,0 +1,88 @@
+from api.tests.base import FoodgramTestCase
+
+# Валидаторы списка, count пагинации, страница рецептов, авторы,
+# теги и ингредиенты; отметки избранного и корзины входят в запрос страницы.
+RECIPE_LIST_QUERIES = 6
+
+
+class RecipeListQueriesTest(FoodgramTestCase):
+    """Число запросов к БД у списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(12):
+            cls.create_recipe(
+                cls.user,
+                f'Рецепт {number}',
+                tags=cls.tags[:2],
+                ingredients=cls.ingredients[:3],
+            )
+
+    def assert_list_queries(self, client):
+        for limit in (2, 10):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(RECIPE_LIST_QUERIES):
+                    response = client.get('/api/recipes/', {'limit': limit})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['results']), limit)
+
+    def test_anonymous(self):
+        self.assert_list_queries(self.anonymous())
+
+    def test_authorized(self):
+        self.assert_list_queries(self.authorized(self.other))
+
+
+class RecipeTagsFilterTest(FoodgramTestCase):
+    """Фильтр по тегам в режимах any и all."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Названия убывают, чтобы порядок не зависел от совпадения pub_date.
+        cls.first = cls.create_recipe(cls.user, 'В', tags=cls.tags[:1])
+        cls.second = cls.create_recipe(cls.user, 'Б', tags=cls.tags[:2])
+        cls.third = cls.create_recipe(cls.user, 'А', tags=cls.tags[1:])
+
+    def filter_tags(self, *slugs, mode=None):
+        params = {'tags': slugs}
+        if mode:
+            params['tags_mode'] = mode
+        return self.anonymous().get('/api/recipes/', params)
+
+    def assert_tags_filter(self, slugs, expected, mode=None):
+        response = self.filter_tags(*slugs, mode=mode)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [recipe.pk for recipe in expected],
+        )
+
+    def test_any(self):
+        expected = [self.third, self.second, self.first]
+        self.assert_tags_filter(('tag0', 'tag1', 'tag2'), expected)
+        self.assert_tags_filter(('tag0', 'tag2'), expected, mode='any')
+        self.assert_tags_filter(('tag2',), [self.third], mode='any')
+
+    def test_all(self):
+        self.assert_tags_filter(('tag0', 'tag1'), [self.second], mode='all')
+        self.assert_tags_filter(('tag1', 'tag2'), [self.third], mode='all')
+        self.assert_tags_filter(('tag0', 'tag2'), [], mode='all')
+
+    def test_all_with_duplicate_slugs(self):
+        self.assert_tags_filter(
+            ('tag0', 'tag0', 'tag1'), [self.second], mode='all'
+        )
+        self.assert_tags_filter(('tag1', 'tag1'), [
+            self.third, self.second
+        ], mode='all')
+
+    def test_invalid_values(self):
+        self.assertEqual(self.filter_tags('unknown').status_code, 400)
+        self.assertEqual(
+            self.filter_tags('tag0', 'unknown', mode='all').status_code, 400
+        )
+        self.assertEqual(
+            self.filter_tags('tag0', mode='every').status_code, 400
+        )
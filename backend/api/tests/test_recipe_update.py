@@ -0,0 +1,137 @@
+from unittest import mock
+
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import FoodgramTestCase, image_data
+from recipes.models import (
+    Ingredient,
+    IngredientRecipe,
+    ShoppingCart,
+    ShoppingListItem,
+)
+
+
+class RecipeIngredientsUpdateTest(FoodgramTestCase):
+    """Изменение ингредиентов рецепта одним пересчетом списков покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ingredients += Ingredient.objects.bulk_create(
+            Ingredient(name=f'специя {number}', measurement_unit='г')
+            for number in range(5)
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(
+            self.user, 'Рагу', tags=self.tags[:1], ingredients=self.ingredients
+        )
+        ShoppingCart.objects.create(user=self.other, recipe=self.recipe)
+
+    def patch(self, ingredients):
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized(self.user).patch(
+                f'/api/recipes/{self.recipe.pk}/',
+                {
+                    'name': 'Рагу',
+                    'text': 'Текст',
+                    'cooking_time': 10,
+                    'image': image_data(),
+                    'tags': [self.tags[0].pk],
+                    'ingredients': [
+                        {'id': ingredient.pk, 'amount': amount}
+                        for ingredient, amount in ingredients
+                    ],
+                },
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(context.captured_queries)
+
+    def test_removed_rows_do_not_add_queries(self):
+        one = self.patch(
+            [(ingredient, 100) for ingredient in self.ingredients[1:]]
+        )
+        self.recipe.refresh_from_db()
+        many = self.patch(
+            [(ingredient, 100) for ingredient in self.ingredients[1:6]]
+            + [(self.ingredients[0], 50)]
+        )
+        self.assertLessEqual(many, one)
+
+    def test_shopping_list_follows_diff(self):
+        self.patch([(self.ingredients[0], 50), (self.ingredients[1], 100)])
+        self.assertEqual(
+            dict(ShoppingListItem.objects.filter(
+                user=self.other
+            ).values_list('ingredient', 'amount')),
+            {self.ingredients[0].pk: 50, self.ingredients[1].pk: 100},
+        )
+
+    def test_removed_rows_send_signals(self):
+        receiver = mock.Mock()
+        post_delete.connect(receiver, sender=IngredientRecipe)
+        self.addCleanup(
+            post_delete.disconnect, receiver, sender=IngredientRecipe
+        )
+        self.patch([(ingredient, 100) for ingredient in self.ingredients[3:]])
+        self.assertCountEqual(
+            [
+                call.kwargs['instance'].name_id
+                for call in receiver.call_args_list
+            ],
+            [ingredient.pk for ingredient in self.ingredients[:3]],
+        )
+
+
+class RecipeWriteValidationTest(FoodgramTestCase):
+    """Ошибки в id тегов и ингредиентов и число запросов их проверки."""
+
+    def post(self, tags, ingredients):
+        return self.authorized(self.user).post(
+            '/api/recipes/',
+            {
+                'name': 'Рагу',
+                'text': 'Текст',
+                'cooking_time': 10,
+                'image': image_data(),
+                'tags': tags,
+                'ingredients': [
+                    {'id': ingredient, 'amount': 10}
+                    for ingredient in ingredients
+                ],
+            },
+            format='json',
+        )
+
+    def test_error_shape(self):
+        response = self.post(
+            [self.tags[0].pk, 404],
+            [self.ingredients[0].pk, 404, 'x'],
+        )
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(len(errors['tags']), 1)
+        self.assertIn('404', errors['tags'][0])
+        self.assertEqual(len(errors['ingredients']), 3)
+        self.assertEqual(errors['ingredients'][0], {})
+        self.assertEqual(list(errors['ingredients'][1]), ['id'])
+        self.assertIn('404', errors['ingredients'][1]['id'][0])
+        self.assertEqual(list(errors['ingredients'][2]), ['id'])
+
+    def test_validation_queries_do_not_grow(self):
+        self.post([self.tags[0].pk], [self.ingredients[0].pk])
+        # Справочники уже в памяти: промахи стоят по одному запросу IN
+        # на теги и на ингредиенты при любом их числе.
+        known = [ingredient.pk for ingredient in self.ingredients]
+        for count in (1, 20):
+            unknown = list(range(1000, 1000 + count))
+            with self.subTest(count=count):
+                with self.assertNumQueries(2):
+                    response = self.post(
+                        [self.tags[0].pk, *unknown], known + unknown
+                    )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,30 @@
+from time import monotonic
+from unittest import mock
+
+from django.conf import settings
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Tag
+
+
+class ReferenceTableTest(FoodgramTestCase):
+    """Справочник в памяти не остается устаревшим навсегда."""
+
+    def test_change_from_other_process_is_picked_up(self):
+        client = self.anonymous()
+        response = client.get('/api/tags/')
+        etag = response['ETag']
+        self.assertEqual(len(response.json()), 3)
+        # bulk_create не отправляет сигналы и не меняет версию в кэше,
+        # как запись из процесса с отдельным LocMemCache.
+        Tag.objects.bulk_create([Tag(name='Перекус', slug='snack')])
+        self.assertEqual(len(client.get('/api/tags/').json()), 3)
+        later = monotonic() + settings.REFERENCE_CACHE_MAX_AGE + 1
+        with mock.patch('recipes.reference.monotonic', return_value=later):
+            response = client.get('/api/tags/')
+            self.assertEqual(len(response.json()), 4)
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertEqual(
+                client.get('/api/recipes/', {'tags': 'snack'}).status_code,
+                200,
+            )
@@ -0,0 +1,74 @@
+from api.tests.base import FoodgramTestCase
+from recipes.models import Ingredient, IngredientRecipe, Recipe
+
+
+class RecipeSearchTest(FoodgramTestCase):
+    """Полнотекстовый поиск рецептов и поддержка индекса триггерами.
+
+    Тесты проходят через API, поэтому проверяют ту ветку поиска, что
+    соответствует базе: FTS5 в SQLite или tsvector в PostgreSQL.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.pumpkin = Ingredient.objects.create(
+            name='тыква', measurement_unit='г'
+        )
+        cls.by_text = cls.create_recipe(
+            cls.user, 'Осенний суп', text='Подавать с тыква и сливками'
+        )
+        cls.by_ingredient = cls.create_recipe(
+            cls.user, 'Каша', ingredients=[cls.pumpkin]
+        )
+        cls.by_name = cls.create_recipe(cls.user, 'Тыква запеченная')
+        cls.unrelated = cls.create_recipe(
+            cls.user, 'Омлет', ingredients=cls.ingredients[:1]
+        )
+
+    def search(self, query):
+        response = self.anonymous().get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_ranking_prefers_name_then_ingredients_then_text(self):
+        self.assertEqual(
+            self.search('тыква'),
+            [self.by_name.pk, self.by_ingredient.pk, self.by_text.pk],
+        )
+
+    def test_no_match(self):
+        self.assertEqual(self.search('ананас'), [])
+        self.assertEqual(self.search('"*:'), [])
+
+    def test_new_recipe_is_indexed(self):
+        recipe = self.create_recipe(self.user, 'Бисквит', text='Ваниль')
+        self.assertEqual(self.search('ваниль'), [recipe.pk])
+
+    def test_recipe_update_is_indexed(self):
+        Recipe.objects.filter(pk=self.unrelated.pk).update(name='Фриттата')
+        self.assertEqual(self.search('фриттата'), [self.unrelated.pk])
+        self.assertEqual(self.search('омлет'), [])
+
+    def test_ingredient_rows_are_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientRecipe.objects.create(
+                recipe=self.unrelated, name=self.pumpkin, amount=10
+            )
+        self.assertIn(self.unrelated.pk, self.search('тыква'))
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientRecipe.objects.filter(
+                recipe=self.unrelated, name=self.pumpkin
+            ).delete()
+        self.assertNotIn(self.unrelated.pk, self.search('тыква'))
+
+    def test_ingredient_rename_is_indexed(self):
+        Ingredient.objects.filter(pk=self.ingredients[0].pk).update(
+            name='шафран'
+        )
+        self.assertEqual(self.search('шафран'), [self.unrelated.pk])
+        self.assertEqual(self.search('картофель'), [])
+
+    def test_deleted_recipe_leaves_index(self):
+        self.by_name.delete()
+        self.assertNotIn(self.by_name.pk, self.search('тыква'))
@@ -0,0 +1,95 @@
+from api.tests.base import FoodgramTestCase
+from core.constants import SHORT_LINK_MAX_ID
+from recipes.models import Recipe
+from recipes.short_links import decode_code, encode_id, find_legacy_recipe
+
+
+class ShortLinkCodeTest(FoodgramTestCase):
+    """Коды base62 однозначно переводятся в id рецептов и обратно."""
+
+    def test_round_trip(self):
+        for pk in (1, 9, 10, 61, 62, 3843, 3844, 10 ** 12, SHORT_LINK_MAX_ID):
+            with self.subTest(pk=pk):
+                self.assertEqual(decode_code(encode_id(pk)), pk)
+        self.assertEqual(encode_id(61), 'Z')
+        self.assertEqual(encode_id(62), '10')
+
+    def test_invalid_codes(self):
+        for code in ('0', '01', 'ab_c', 'абв', 'z' * 17, 'ZZZZZZZZZZZZ'):
+            with self.subTest(code=code):
+                self.assertIsNone(decode_code(code))
+
+
+class ShortLinkRedirectTest(FoodgramTestCase):
+    """Переход по короткой ссылке только к существующему рецепту."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipe(cls.user, 'Рецепт')
+        cls.legacy = cls.create_recipe(cls.user, 'Старый рецепт')
+        Recipe.objects.filter(pk=cls.legacy.pk).update(short_link='3f2a-9c1b')
+
+    def setUp(self):
+        super().setUp()
+        find_legacy_recipe.cache_clear()
+
+    def follow(self, code):
+        return self.anonymous().get(f'/s/{code}/')
+
+    def assert_redirects_to(self, code, recipe):
+        response = self.follow(code)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            response['Location'].endswith(f'/recipes/{recipe.pk}/')
+        )
+
+    def test_link_from_api(self):
+        response = self.anonymous().get(
+            f'/api/recipes/{self.recipe.pk}/get-link/'
+        )
+        code = response.json()['short-link'].rstrip('/').rsplit('/', 1)[-1]
+        self.assertEqual(code, encode_id(self.recipe.pk))
+        self.assert_redirects_to(code, self.recipe)
+        with self.assertNumQueries(0):
+            self.assert_redirects_to(code, self.recipe)
+
+    def test_legacy_code(self):
+        self.assert_redirects_to('3f2a-9c1b', self.legacy)
+        with self.assertNumQueries(0):
+            self.assert_redirects_to('3f2a-9c1b', self.legacy)
+
+    def test_unknown_code(self):
+        for code in (
+            encode_id(self.legacy.pk + 1000),
+            '0',
+            'ZZZZZZZZZZZZ',
+            '0000-0000',
+        ):
+            with self.subTest(code=code):
+                self.assertEqual(self.follow(code).status_code, 404)
+
+    def test_deleted_recipe(self):
+        for recipe, code in (
+            (self.recipe, encode_id(self.recipe.pk)),
+            (self.legacy, '3f2a-9c1b'),
+        ):
+            with self.subTest(code=code):
+                self.assert_redirects_to(code, recipe)
+                with self.captureOnCommitCallbacks(execute=True):
+                    recipe.delete()
+                self.assertEqual(self.follow(code).status_code, 404)
+
+    def test_created_recipe_after_miss(self):
+        pk = self.legacy.pk + 100
+        self.assertEqual(self.follow(encode_id(pk)).status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                pk=pk,
+                author=self.user,
+                name='Новый рецепт',
+                text='Текст',
+                cooking_time=10,
+                image='recipes/images/test.png',
+            )
+        self.assert_redirects_to(encode_id(pk), recipe)
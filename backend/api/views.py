@@ -1,19 +1,56 @@
+from hashlib import md5
+
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Count, Sum
-from django.http import HttpResponse, HttpResponseRedirect
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    Max,
+    OuterRef,
+    Prefetch,
+    Value,
+)
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from rest_framework import status, viewsets
 from djoser.views import UserViewSet
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 from api.filters import IngredientFilter, RecipeFilter
-from api.mixins import ListRetrieveViewSet
+from api.mixins import (
+    AnonymousCacheMixin,
+    ConditionalGetMixin,
+    ListRetrieveViewSet,
+    QueryBudgetMixin,
+    ReferenceCacheMixin,
+    get_query_string,
+)
 from api.pagination import PageLimitPagination
 from api.permissions import IsAdminAuthorOrReadOnly
+from api.renderers import (
+    ShoppingCartCSVRenderer,
+    ShoppingCartNegotiation,
+    ShoppingCartPDFRenderer,
+    ShoppingCartTextRenderer,
+)
 from api.serializers import (
     AvatarSerializer,
+    CookableQuerySerializer,
+    CookableRecipeSerializer,
     FavoriteSerializer,
     FollowSerializer,
     IngredientSerializer,
@@ -23,25 +60,92 @@ from api.serializers import (
     SubscriptionSerializer,
     TagSerializer,
     UserSerializer,
+    get_recipes_limit,
+)
+from api.shopping_list import SHOPPING_CART_EXPORTS, get_shopping_list
+from core.cache import get_version
+from core.constants import (
+    CURSOR_ORDERING,
+    ERROR_CURSOR_SEARCH,
+    INGREDIENTS_AUTOCOMPLETE_LIMIT,
+    INGREDIENTS_AUTOCOMPLETE_MAX_AGE,
+    INGREDIENTS_AUTOCOMPLETE_MAX_LIMIT,
+    INGREDIENTS_VERSION,
+    PREFIX_SHORT_LINK_RECIPE,
+    RECIPE_COUNTERS_VERSION,
+    RECIPE_ORDERINGS,
+    RECIPE_VALIDATORS_PREFIX,
+    RECIPE_VERSION,
+    RECIPES_CACHE_PREFIX,
+    RECIPES_CACHE_VERSION,
+    SHOPPING_CART_FILENAME,
+    USER_VERSION,
 )
-from core.constants import NO_CONTENT, PREFIX_SHORT_LINK_RECIPE
+from recipes import reference
+from recipes.autocomplete import (
+    autocomplete_ingredients,
+    get_ingredient_index,
+)
+from recipes.cookable import find_cookable_recipes
+from recipes.counters import ordering_counters
 from recipes.models import (
     Favorite,
     Ingredient,
+    IngredientRecipe,
     Recipe,
     ShoppingCart,
     Tag,
 )
+from recipes.short_links import encode_id, resolve_short_link
 from users.models import Subscription, User
 
+UPLOAD_PARSERS = (JSONParser, MultiPartParser, FormParser)
+
+
+def annotate_is_subscribed(queryset, user):
+    """Добавляет к пользователям признак подписки текущего пользователя."""
+    if not user.is_authenticated:
+        return queryset
+    return queryset.annotate(is_subscribed=Exists(Subscription.objects.filter(
+        user=user, following=OuterRef('pk')
+    )))
 
-class UserViewSet(UserViewSet):
+
+class UserViewSet(QueryBudgetMixin, ConditionalGetMixin, UserViewSet):
     """Вьюсет пользователя."""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = PageLimitPagination
     lookup_field = 'id'
+    query_budgets = {
+        'list': 3,
+        'retrieve': 2,
+        'me': 2,
+        'subscriptions': 4,
+        'subscribe': 10,
+        'unsubscribe': 6,
+        'update_avatar': 8,
+        'delete_avatar': 7,
+    }
+
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
+    def get_validators(self):
+        if self.action == 'me':
+            pk = self.request.user.pk
+        elif self.action == 'retrieve' and self.kwargs['id'].isdigit():
+            pk = int(self.kwargs['id'])
+        else:
+            return None
+        return (
+            pk,
+            get_version(USER_VERSION.format(pk)),
+            self.get_viewer_version(),
+        ), None
 
     @action(
         detail=False,
@@ -56,6 +160,7 @@ class UserViewSet(UserViewSet):
         detail=False,
         methods=('PUT',),
         url_path='me/avatar',
+        parser_classes=UPLOAD_PARSERS,
     )
     def update_avatar(self, request):
         serializer = AvatarSerializer(request.user, data=request.data)
@@ -65,7 +170,8 @@ class UserViewSet(UserViewSet):
 
     @update_avatar.mapping.delete
     def delete_avatar(self, request):
-        request.user.avatar.delete()
+        request.user.avatar = None
+        request.user.save(update_fields=('avatar',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -74,10 +180,19 @@ class UserViewSet(UserViewSet):
         permission_classes=[IsAuthenticated],
     )
     def subscriptions(self, request):
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
         followings = (
             User.objects.filter(followings__user=request.user)
-            .prefetch_related('recipes')
-            .annotate(recipes_count=Count('recipes'))
+            .prefetch_related(Prefetch(
+                'recipes', queryset=recipes, to_attr='recipes_preview'
+            ))
+            .annotate(
+                is_subscribed=Value(True),
+                subscription_id=F('followings__id'),
+            )
         )
         pages = self.paginate_queryset(followings)
         serializer = SubscriptionSerializer(
@@ -85,6 +200,9 @@ class UserViewSet(UserViewSet):
         )
         return self.get_paginated_response(serializer.data)
 
+    def get_cursor_ordering(self):
+        return ('-subscription_id',)
+
     def get_following(self):
         return get_object_or_404(User, id=self.kwargs.get('id'))
 
@@ -93,6 +211,7 @@ class UserViewSet(UserViewSet):
         methods=('POST',),
         permission_classes=(IsAuthenticated,)
     )
+    @transaction.atomic
     def subscribe(self, request, id=None):
         subscription_data = {
             'user': request.user.id,
@@ -117,15 +236,27 @@ class UserViewSet(UserViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(ListRetrieveViewSet):
+class TagViewSet(
+    QueryBudgetMixin,
+    ConditionalGetMixin,
+    ReferenceCacheMixin,
+    ListRetrieveViewSet,
+):
     """Вьюсет тега."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
+    reference = reference.tags
+    query_budgets = {'list': 2, 'retrieve': 2}
 
 
-class IngredientViewSet(ListRetrieveViewSet):
+class IngredientViewSet(
+    QueryBudgetMixin,
+    ConditionalGetMixin,
+    ReferenceCacheMixin,
+    ListRetrieveViewSet,
+):
     """Вьюсет ингредиента."""
 
     queryset = Ingredient.objects.all()
@@ -133,10 +264,56 @@ class IngredientViewSet(ListRetrieveViewSet):
     permission_classes = (AllowAny,)
     filter_backends = (IngredientFilter,)
     search_fields = ('^name',)
+    reference = reference.ingredients
+    query_budgets = {'list': 2, 'retrieve': 2, 'autocomplete': 2}
+
+    def filter_reference(self, objects):
+        terms = IngredientFilter().get_search_terms(self.request)
+        if not terms:
+            return objects
+        return get_ingredient_index().filter(terms)
+
+    def get_autocomplete_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit'))
+        except (TypeError, ValueError):
+            return INGREDIENTS_AUTOCOMPLETE_LIMIT
+        return min(max(limit, 1), INGREDIENTS_AUTOCOMPLETE_MAX_LIMIT)
+
+    @action(
+        detail=False,
+        methods=('GET',),
+    )
+    def autocomplete(self, request):
+        query = request.query_params.get(
+            IngredientFilter.search_param, ''
+        ).strip()
+        limit = self.get_autocomplete_limit()
+        etag = quote_etag('{}-{}'.format(
+            get_version(INGREDIENTS_VERSION),
+            md5(f'{query.lower()}:{limit}'.encode()).hexdigest(),
+        ))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(
+                autocomplete_ingredients(query, limit) if query else []
+            )
+        response['ETag'] = etag
+        patch_cache_control(
+            response, public=True, max_age=INGREDIENTS_AUTOCOMPLETE_MAX_AGE
+        )
+        return response
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(
+    QueryBudgetMixin,
+    ConditionalGetMixin,
+    AnonymousCacheMixin,
+    viewsets.ModelViewSet,
+):
     """Вьюсет для модели Recipe."""
+    cache_prefix = RECIPES_CACHE_PREFIX
+    cache_version = RECIPES_CACHE_VERSION
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
@@ -144,10 +321,142 @@ class RecipeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAdminAuthorOrReadOnly,)
     http_method_names = ('get', 'post', 'patch', 'delete',)
     lookup_field = 'id'
+    parser_classes = UPLOAD_PARSERS
+    query_budgets = {
+        'list': 8,
+        'retrieve': 6,
+        'get_link': 2,
+        'favorite': 8,
+        'delete_recipe_from_favorite': 6,
+        'shopping_cart': 13,
+        'delete_recipe_from_shopping_cart': 11,
+        'download_shopping_cart': 2,
+        'what_can_i_cook': 4,
+    }
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Recipe.objects.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=annotate_is_subscribed(User.objects.all(), user)
+            ),
+            'tags',
+            Prefetch(
+                'ingredient_recipe',
+                queryset=IngredientRecipe.objects.select_related('name')
+            ),
+        )
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_favorited=Exists(Favorite.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+                is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                    user=user, recipe=OuterRef('pk')
+                )),
+            )
+        return queryset
+
+    def get_validators(self):
+        if self.action == 'retrieve':
+            return self.get_recipe_validators()
+        if self.action == 'list':
+            return self.get_list_validators()
+        return None
+
+    def get_recipe_validators(self):
+        """Версия и дата изменения рецепта, закэшированные по его версии."""
+        if not self.kwargs['id'].isdigit():
+            return None
+        pk = int(self.kwargs['id'])
+        key = ':'.join(str(part) for part in (
+            RECIPE_VALIDATORS_PREFIX,
+            pk,
+            get_version(RECIPE_VERSION.format(pk)),
+        ))
+        validators = cache.get(key)
+        if validators is None:
+            validators = Recipe.objects.filter(pk=pk).values_list(
+                'version', 'updated_at'
+            ).first()
+            if validators is None:
+                return None
+            cache.set(key, validators, settings.RECIPES_CACHE_TIMEOUT)
+        version, updated_at = validators
+        return (pk, version, updated_at, self.get_viewer_version()), updated_at
+
+    def get_counters_version(self):
+        """Версия счетчиков, если по ним отсортирована выдача.
+
+        Счетчики меняются UPDATE без смены даты изменения рецептов,
+        поэтому для таких сортировок версия входит в валидаторы
+        и ключ кэша ответов анонимам.
+        """
+        if ordering_counters(RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'), ()
+        )):
+            return get_version(RECIPE_COUNTERS_VERSION)
+        return None
+
+    def get_cache_key(self, request):
+        key = super().get_cache_key(request)
+        counters_version = self.get_counters_version()
+        if counters_version is None:
+            return key
+        return f'{key}:{counters_version}'
+
+    def get_list_validators(self):
+        """Количество рецептов и последняя дата изменения в выборке.
+
+        Агрегат кэшируется до смены общей версии рецептов или, для
+        сортировок по счетчикам, версии счетчиков. Last-Modified списку
+        не отдается: удаление рецепта, пересчет счетчиков и рейтинга
+        меняют выдачу, но не дату изменения, а ETag учитывает их через
+        количество и версии.
+        """
+        query = get_query_string(self.request)
+        viewer_version = self.get_viewer_version()
+        version = get_version(RECIPES_CACHE_VERSION)
+        counters_version = self.get_counters_version()
+        key = ':'.join(str(part) for part in (
+            RECIPE_VALIDATORS_PREFIX,
+            self.action,
+            version,
+            counters_version,
+            self.request.user.pk,
+            viewer_version,
+            md5(query.encode()).hexdigest(),
+        ))
+        validators = cache.get(key)
+        if validators is None:
+            validators = self.filter_queryset(
+                self.get_queryset()
+            ).order_by().aggregate(
+                count=Count('pk'), updated_at=Max('updated_at')
+            )
+            cache.set(key, validators, settings.RECIPES_CACHE_TIMEOUT)
+        return (
+            version,
+            counters_version,
+            validators['count'],
+            validators['updated_at'],
+            viewer_version,
+            query,
+        ), None
+
+    def get_cursor_ordering(self):
+        if self.request.query_params.get('search'):
+            raise ValidationError({'cursor': ERROR_CURSOR_SEARCH})
+        return RECIPE_ORDERINGS.get(
+            self.request.query_params.get('ordering'),
+            CURSOR_ORDERING,
+        )
 
     def get_recipe(self):
         return get_object_or_404(Recipe, id=self.kwargs.get('id'))
 
+    @transaction.atomic
     def add_recipe_to_model(self, request, serializer):
         data = {
             'user': request.user.id,
@@ -182,7 +491,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_link(self, request, id=None):
         recipe = self.get_recipe()
-        short_link = f'/{PREFIX_SHORT_LINK_RECIPE}{recipe.short_link}/'
+        short_link = f'/{PREFIX_SHORT_LINK_RECIPE}{encode_id(recipe.pk)}/'
         return Response(
             {'short-link': request.build_absolute_uri(short_link)},
             status=status.HTTP_200_OK
@@ -203,33 +512,57 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(
         detail=False,
         methods=('GET',),
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartPDFRenderer,
+        ),
+        content_negotiation_class=ShoppingCartNegotiation,
     )
     def download_shopping_cart(self, request, id=None):
-        shopping_cart = NO_CONTENT
-        recip = ShoppingCart.objects.filter(user=request.user).values('recipe')
-        if recip:
-            shopping_cart = []
-            ingredients = Ingredient.objects.filter(
-                recipes__in=recip
-            ).values(
-                'name',
-                'ingredient_recipe__name__measurement_unit',
-            ).annotate(amount=Sum('ingredient_recipe__amount'))
-            for ingredient in ingredients:
-                name = ingredient['name']
-                measurement_un = ingredient[
-                    'ingredient_recipe__name__measurement_unit'
-                ]
-                amount = ingredient['amount']
-                shopping_cart.append(
-                    f'• {name} ({measurement_un}) — {amount}')
-            shopping_cart = '\n'.join(shopping_cart)
-        response = HttpResponse(shopping_cart, content_type='text/plain')
+        renderer = request.accepted_renderer
+        export_format = renderer.format
+        response_class = (
+            StreamingHttpResponse if renderer.streaming else HttpResponse
+        )
+        response = response_class(
+            SHOPPING_CART_EXPORTS[export_format](
+                get_shopping_list(request.user)
+            ),
+            content_type=renderer.media_type,
+        )
         response['Content-Disposition'] = (
-            'attachment; filename="my_shopping_cart.txt"')
+            f'attachment; filename="{SHOPPING_CART_FILENAME}.'
+            f'{export_format}"'
+        )
         return response
 
+    @action(
+        detail=False,
+        methods=('GET',),
+        url_path='what-can-i-cook',
+    )
+    def what_can_i_cook(self, request):
+        """Рецепты по доле ингредиентов, которые есть у пользователя."""
+        data = {
+            'ingredients': [
+                value
+                for item in request.query_params.getlist('ingredients')
+                for value in item.split(',') if value
+            ],
+        }
+        if 'limit' in request.query_params:
+            data['limit'] = request.query_params['limit']
+        query = CookableQuerySerializer(data=data)
+        query.is_valid(raise_exception=True)
+        serializer = CookableRecipeSerializer(
+            find_cookable_recipes(**query.validated_data),
+            many=True,
+            context={'request': request},
+        )
+        return Response(serializer.data)
+
     @action(
         detail=True,
         methods=('POST',),
@@ -243,7 +576,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
 
 def redirect_to_recipe(request, short_link):
-    recipe_id = get_object_or_404(Recipe, short_link=short_link).id
+    recipe_id = resolve_short_link(short_link)
+    if recipe_id is None:
+        raise Http404
     return HttpResponseRedirect(
         request.build_absolute_uri(f'/recipes/{recipe_id}/'),
     )
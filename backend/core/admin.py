@@ -0,0 +1,17 @@
+from django.contrib import admin
+
+
+class FixedOwnerAdmin(admin.ModelAdmin):
+    """Запрещает переносить запись к другому пользователю или рецепту.
+
+    Сигналы обновляют счетчики и списки покупок только для текущих
+    владельцев записи, прежние при переносе остались бы неверными.
+    """
+
+    owner_fields = ()
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        if obj is None:
+            return readonly_fields
+        return (*readonly_fields, *self.owner_fields)
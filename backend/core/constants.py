@@ -10,7 +10,7 @@ MSG_FO_MIN_COOKING = f'Значение не может быть меньше {M
 MSG_FO_MAX_COOKING = f'Значение не может быть больше {MAX_COOKING_TIME}!'
 
 SHORT_LINK_MAX_LENGTH = 16
-MAX_ATTEMPTS = 10
+IMAGE_HASH_LENGTH = 64
 MIN_AMOUNT_INGREDIENTS = 1
 MAX_AMOUNT_INGREDIENTS = 32000
 MSG_FO_MIN_INGREDIENTS = (
@@ -45,16 +45,121 @@ IMAGE_ERROR = 'Необходимо добавить изображение!'
 RECIPE_ADD_ERR0R = 'Этот рецепт уже добавлен в список покупок!'
 
 ERROR_ME_FOLLOW = 'Нельзя подписаться на самого себя!'
+ERROR_CURSOR_SEARCH = (
+    'Курсорная пагинация не сохраняет порядок релевантности поиска, '
+    'используйте параметр page.'
+)
 
 FOLLOWING_ERROR = 'Такая подписка уже существует!'
 
 PREFIX_SHORT_LINK_RECIPE = 's/'
+SHORT_LINK_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+SHORT_LINK_LEGACY_SEPARATOR = '-'
+SHORT_LINK_CACHE_SIZE = 4096
+SHORT_LINK_MAX_ID = 2 ** 63 - 1
 
 NO_CONTENT = 'Список покупок пуст!'
+SHOPPING_CART_FILENAME = 'my_shopping_cart'
+SHOPPING_CART_TITLE = 'Список покупок'
+SHOPPING_CART_CSV_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+MEASUREMENT_UNIT_CONVERSIONS = {
+    'кг': ('г', 1000),
+    'л': ('мл', 1000),
+    'шт': ('шт.', 1),
+}
 
 PAGE_SIZE = 6
+COUNT_MODE_EXACT = 'exact'
+COUNT_MODE_ESTIMATE = 'estimate'
+COUNT_MODE_NONE = 'none'
+COUNT_MODES = (COUNT_MODE_EXACT, COUNT_MODE_ESTIMATE, COUNT_MODE_NONE)
+
+RECIPES_CACHE_VERSION = 'recipes'
+RECIPES_CACHE_PREFIX = 'recipes-response:v2'
+RECIPE_FRAGMENT_PREFIX = 'recipe-fragment:v2'
+RECIPE_VERSION = 'recipe:{}'
+USER_VERSION = 'user:{}'
+TAGS_VERSION = 'tags'
+INGREDIENTS_VERSION = 'ingredients'
+VIEWER_VERSION = 'viewer:{}'
+RECIPE_COUNTERS_VERSION = 'recipe-counters'
+RECIPE_VALIDATORS_PREFIX = 'recipe-validators:v1'
+SHORT_LINK_EXISTS_PREFIX = 'short-link-recipe:v1'
+
+RECIPE_ORDERINGS = {
+    '-pub_date': ('-pub_date', 'name'),
+    'popular': ('-favorites_count', '-pub_date'),
+    'trending': ('-trending_score', '-pub_date'),
+    'cooking_time': ('cooking_time', '-pub_date'),
+}
+CURSOR_ORDERING = ('-pub_date', '-id')
+RECIPE_ORDERING_CHOICES = tuple(
+    (ordering, ordering) for ordering in RECIPE_ORDERINGS
+)
+
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_WINDOW_DAYS = 7
+TRENDING_FAVORITE_WEIGHT = 1.0
+TRENDING_SHOPPING_CART_WEIGHT = 0.5
+
+INGREDIENTS_AUTOCOMPLETE_LIMIT = 10
+INGREDIENTS_AUTOCOMPLETE_MAX_LIMIT = 50
+INGREDIENTS_AUTOCOMPLETE_MAX_AGE = 60
+
+COOKABLE_LIMIT = 10
+COOKABLE_MAX_LIMIT = 50
+COOKABLE_MAX_INGREDIENTS = 50
+COOKABLE_SYNC_MARGIN_SECONDS = 60
+COOKABLE_BUILD_CHUNK_SIZE = 10000
+COOKABLE_FIELDS = ('coverage', 'matched', 'total')
 
 RECIPE_FILTER_CHOICES = (
     (0, False),
     (1, True)
 )
+TAGS_MODE_ANY = 'any'
+TAGS_MODE_ALL = 'all'
+TAGS_MODE_CHOICES = (
+    (TAGS_MODE_ANY, TAGS_MODE_ANY),
+    (TAGS_MODE_ALL, TAGS_MODE_ALL),
+)
+
+IMAGE_RENDITIONS_DIR = 'renditions'
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+AVATAR_IMAGE_RENDITIONS = {
+    'thumbnail': (64, 64),
+    'card': (160, 160),
+    'full': (512, 512),
+}
+IMAGE_RENDITION_FORMATS = {
+    'webp': ('WEBP', 80),
+    'jpeg': ('JPEG', 85),
+}
+IMAGE_TASK_KIND_MAX_LENGTH = 16
+IMAGE_TASK_STATUS_MAX_LENGTH = 16
+IMAGE_TASK_MAX_ATTEMPTS = 3
+IMAGE_TASK_STALE_SECONDS = 600
+ERROR_IMAGE_TASK_STALE = 'Обработка не завершилась за отведенное время'
+IMAGE_WORKERS = 4
+IMAGE_WORKER_BATCH_SIZE = 20
+IMAGE_WORKER_POLL_SECONDS = 2
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_READ_SIZE = 64 * 1024
+DEMO_AUTHOR_EMAIL = 'demo@foodgram.local'
+DEMO_AUTHOR_USERNAME = 'demo'
+DEMO_IMAGE_SIZE = (640, 480)
+DEMO_IMAGE_COLORS = ('#f4a261', '#2a9d8f', '#e76f51', '#8ab17d')
+SYNTHETIC_PREFIX = 'synthetic'
+SYNTHETIC_PASSWORD = 'synthetic-password'
+BENCHMARK_ITERATIONS = 50
+BENCHMARK_WARMUP = 5
+BENCHMARK_ALLOC_ITERATIONS = 5
+BENCHMARK_RECIPES_SAMPLE = 20
+BENCHMARK_HOST = 'testserver'
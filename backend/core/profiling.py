@@ -0,0 +1,141 @@
+import logging
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('foodgram.profile')
+
+current_profile = ContextVar('current_profile', default=None)
+
+# Служебные команды транзакций зависят от бэкенда и от того, вложен ли
+# atomic, поэтому в бюджет запросов они не входят.
+TRANSACTION_STATEMENTS = (
+    'BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT',
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Действие вьюсета выполнило больше запросов к БД, чем заявлено."""
+
+
+class RequestProfile:
+    """Счетчики одного запроса: запросы к БД и затраченное время.
+
+    Экземпляр подключается к соединению через execute_wrapper
+    и учитывает каждый выполненный SQL-запрос, кроме команд транзакций.
+    """
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db_time = 0
+        self.view = None
+        self.budget = None
+        self.view_started = None
+        self.view_time = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            if not sql.lstrip().upper().startswith(TRANSACTION_STATEMENTS):
+                self.queries += 1
+
+    def start_view(self, view, budget):
+        self.view = view
+        self.budget = budget
+        self.view_started = (perf_counter(), self.db_time)
+
+    def finish_view(self):
+        """Время обработчика без учета БД: сериализация и валидация."""
+        if self.view_started is None or self.view_time is not None:
+            return
+        started, db_time = self.view_started
+        self.view_time = (
+            perf_counter() - started - (self.db_time - db_time)
+        )
+
+    def as_dict(self):
+        return {
+            'view': self.view,
+            'queries': self.queries,
+            'budget': self.budget,
+            'db_ms': round(self.db_time * 1000, 2),
+            'serializer_ms': (
+                round(self.view_time * 1000, 2)
+                if self.view_time is not None else None
+            ),
+            'total_ms': round((perf_counter() - self.started) * 1000, 2),
+        }
+
+
+def server_timing(stats):
+    return ', '.join(
+        f'{name};dur={stats[f"{name}_ms"]}'
+        for name in ('db', 'serializer', 'total')
+        if stats[f'{name}_ms'] is not None
+    )
+
+
+class RequestProfileMiddleware:
+    """Замеры запросов к БД и времени обработки каждого запроса.
+
+    Результат пишется в журнал foodgram.profile и, если включено,
+    в заголовки Server-Timing и X-Query-Count. Превышение бюджета
+    запросов вьюсета записывается предупреждением, а в строгом режиме
+    вызывает QueryBudgetExceeded, чтобы тест упал. У потоковых ответов
+    запросы считаются до конца отправки тела, поэтому итог пишется
+    в журнал после нее, а заголовки не ставятся.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        try:
+            with connection.execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            current_profile.reset(token)
+        if profile.view is None and request.resolver_match is not None:
+            profile.view = request.resolver_match.view_name
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, request, profile
+            )
+            return response
+        stats = self.report(request, profile)
+        if settings.REQUEST_PROFILE_HEADERS:
+            response['Server-Timing'] = server_timing(stats)
+            response['X-Query-Count'] = stats['queries']
+        return response
+
+    def stream(self, content, request, profile):
+        with connection.execute_wrapper(profile):
+            yield from content
+        self.report(request, profile)
+
+    def report(self, request, profile):
+        stats = profile.as_dict()
+        logger.info(
+            '%s %s %s',
+            request.method,
+            request.path,
+            ' '.join(f'{key}={value}' for key, value in stats.items()),
+            extra={'profile': stats},
+        )
+        if profile.budget is not None and profile.queries > profile.budget:
+            message = (
+                f'{profile.view}: {profile.queries} запросов к БД '
+                f'при бюджете {profile.budget}'
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={'profile': stats})
+        return stats
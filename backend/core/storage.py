@@ -0,0 +1,34 @@
+import posixpath
+from hashlib import sha256
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, называющее файлы по хэшу содержимого.
+
+    Одинаковые файлы сохраняются один раз: повторная загрузка возвращает
+    имя уже записанного файла. Содержимое файла по имени никогда
+    не меняется, поэтому его можно кэшировать навсегда.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        content_hash = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        name = posixpath.join(
+            directory,
+            content_hash[:2],
+            content_hash + posixpath.splitext(filename)[1].lower(),
+        )
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
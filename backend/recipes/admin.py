@@ -1,8 +1,10 @@
 from django.contrib import admin
 
+from core.admin import FixedOwnerAdmin
 from core.constants import EMPTY_VALUE_ADMIN_PANEL
 from recipes.models import (
     Favorite,
+    ImageTask,
     Ingredient,
     IngredientRecipe,
     Recipe,
@@ -40,37 +42,51 @@ class IngredientRecipeInline(admin.TabularInline):
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(FixedOwnerAdmin):
     """Админ панель для модели рецепт."""
 
+    owner_fields = ('author',)
     inlines = (IngredientRecipeInline,)
     list_display = ('name', 'author', 'count_is_favorited')
     search_fields = ('author__username', 'name')
     list_filter = ('tags',)
 
-    @admin.display(description='Количество добавлений в избранное')
+    @admin.display(
+        description='Количество добавлений в избранное',
+        ordering='favorites_count',
+    )
     def count_is_favorited(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(IngredientRecipe)
-class IngredientRecipeAdmin(admin.ModelAdmin):
+class IngredientRecipeAdmin(FixedOwnerAdmin):
     """Админ панель для модели ингредиент в рецепте."""
 
     list_display = ('id', 'name', 'recipe', 'amount')
-    list_editable = ('name', 'recipe', 'amount')
+    list_editable = ('name', 'amount')
+    owner_fields = ('recipe',)
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(FixedOwnerAdmin):
     """Админ панель для модели рецепт в избранном."""
 
     list_display = ('id', 'user', 'recipe')
-    list_editable = ('user', 'recipe')
+    owner_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(FixedOwnerAdmin):
     """Админ панель для модели рецепт в списке покупок."""
     list_display = ('id', 'user', 'recipe')
-    list_editable = ('user', 'recipe')
+    owner_fields = ('user', 'recipe')
+
+
+@admin.register(ImageTask)
+class ImageTaskAdmin(admin.ModelAdmin):
+    """Админ панель для очереди обработки изображений."""
+
+    list_display = ('id', 'kind', 'object_id', 'status', 'attempts', 'updated')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('error',)
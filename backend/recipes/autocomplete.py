@@ -0,0 +1,105 @@
+from bisect import bisect_left
+from itertools import islice
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+
+from recipes import reference
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    """Отсортированный по названию индекс ингредиентов в памяти процесса."""
+
+    def __init__(self, ingredients):
+        self.items = sorted(
+            (ingredient.name.lower(), position, ingredient)
+            for position, ingredient in enumerate(ingredients)
+        )
+        self.keys = [item[0] for item in self.items]
+
+    def prefix_matches(self, query):
+        start = bisect_left(self.keys, query)
+        for key, position, ingredient in self.items[start:]:
+            if not key.startswith(query):
+                break
+            yield position, ingredient
+
+    def search(self, query, limit):
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        query = query.lower()
+        found = [
+            ingredient for _, ingredient in islice(
+                self.prefix_matches(query), limit
+            )
+        ]
+        if len(found) < limit:
+            for key, _, ingredient in self.items:
+                if query in key and not key.startswith(query):
+                    found.append(ingredient)
+                    if len(found) == limit:
+                        break
+        return found
+
+    def filter(self, terms):
+        """Ингредиенты, название которых начинается с каждого из слов.
+
+        Порядок совпадает с порядком сортировки модели.
+        """
+        terms = [term.lower() for term in terms]
+        return [
+            ingredient for _, ingredient in sorted(
+                (position, ingredient)
+                for position, ingredient in self.prefix_matches(terms[0])
+                if all(
+                    ingredient.name.lower().startswith(term)
+                    for term in terms[1:]
+                )
+            )
+        ]
+
+
+_index = (None, None)
+
+
+def get_ingredient_index():
+    """Индекс пересобирается, только если изменилась версия ингредиентов."""
+    global _index
+    version = reference.ingredients.version
+    index_version, index = _index
+    if index is None or index_version != version:
+        index = IngredientIndex(reference.ingredients.all())
+        _index = (version, index)
+    return index
+
+
+def search_ingredients_in_db(query, limit):
+    """Поиск по триграммному и префиксному индексам PostgreSQL."""
+    return list(
+        Ingredient.objects.filter(
+            name__icontains=query
+        ).annotate(
+            rank=Case(
+                When(name__istartswith=query, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by(
+            'rank', 'name'
+        ).values(
+            'id', 'name', 'measurement_unit'
+        )[:limit]
+    )
+
+
+def autocomplete_ingredients(query, limit):
+    if connection.vendor == 'postgresql':
+        return search_ingredients_in_db(query, limit)
+    return [
+        {
+            'id': ingredient.pk,
+            'name': ingredient.name,
+            'measurement_unit': ingredient.measurement_unit,
+        }
+        for ingredient in get_ingredient_index().search(query, limit)
+    ]
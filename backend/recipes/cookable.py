@@ -0,0 +1,153 @@
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+from heapq import nlargest
+from time import monotonic
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.cache import get_version
+from core.constants import (
+    COOKABLE_BUILD_CHUNK_SIZE,
+    COOKABLE_SYNC_MARGIN_SECONDS,
+    RECIPES_CACHE_VERSION,
+)
+from recipes.models import IngredientRecipe, Recipe
+
+
+class CoverageIndex:
+    """Инвертированный индекс «ингредиент → рецепты» в памяти процесса."""
+
+    def __init__(self):
+        self.postings = defaultdict(set)
+        self.recipes = {}
+
+    def set_recipe(self, pk, ingredients):
+        self.remove_recipe(pk)
+        if not ingredients:
+            return
+        self.recipes[pk] = frozenset(ingredients)
+        for ingredient in self.recipes[pk]:
+            self.postings[ingredient].add(pk)
+
+    def remove_recipe(self, pk):
+        for ingredient in self.recipes.pop(pk, ()):
+            self.postings[ingredient].discard(pk)
+
+    def update(self, rows, pks=()):
+        """Заменяет ингредиенты рецептов строками (recipe_id, ingredient_id).
+
+        Рецепты из pks без строк удаляются из индекса.
+        """
+        grouped = defaultdict(list)
+        for recipe_id, ingredient_id in rows:
+            grouped[recipe_id].append(ingredient_id)
+        for pk in set(pks) - grouped.keys():
+            self.remove_recipe(pk)
+        for pk, ingredients in grouped.items():
+            self.set_recipe(pk, ingredients)
+
+    def top(self, ingredients, limit):
+        """Лучшие рецепты по доле имеющихся ингредиентов.
+
+        Возвращает кортежи (доля, совпало, всего, id рецепта); при равной
+        доле выше рецепты с большим числом совпадений, затем более новые.
+        """
+        matched = Counter()
+        for ingredient in set(ingredients):
+            matched.update(self.postings.get(ingredient, ()))
+        return nlargest(limit, (
+            (count / len(self.recipes[pk]), count, len(self.recipes[pk]), pk)
+            for pk, count in matched.items()
+        ))
+
+
+class CookableIndex:
+    """Индекс с инкрементальным обновлением по дате изменения рецептов.
+
+    Когда меняется общая версия рецептов или прошло больше
+    COOKABLE_INDEX_MAX_AGE секунд (изменения из других процессов при
+    кэше, не общем для процессов), перечитываются только рецепты,
+    измененные с момента прошлой синхронизации (с запасом на транзакции,
+    зафиксированные позже). Удаленные рецепты убираются при выдаче.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.version = None
+        self.synced = None
+        self.checked = None
+
+    def build(self):
+        index = CoverageIndex()
+        index.update(IngredientRecipe.objects.order_by().values_list(
+            'recipe_id', 'name_id'
+        ).iterator(chunk_size=COOKABLE_BUILD_CHUNK_SIZE))
+        return index
+
+    def refresh(self, since):
+        changed = list(Recipe.objects.filter(
+            updated_at__gte=since
+        ).values_list('pk', flat=True))
+        self.index.update(
+            IngredientRecipe.objects.filter(
+                recipe__updated_at__gte=since
+            ).order_by().values_list('recipe_id', 'name_id'),
+            changed,
+        )
+
+    def sync(self):
+        version = get_version(RECIPES_CACHE_VERSION)
+        if (
+            self.index is not None
+            and version == self.version
+            and monotonic() - self.checked < settings.COOKABLE_INDEX_MAX_AGE
+        ):
+            return
+        started = timezone.now()
+        if self.index is None:
+            self.index = self.build()
+        else:
+            self.refresh(
+                self.synced - timedelta(seconds=COOKABLE_SYNC_MARGIN_SECONDS)
+            )
+        self.version = version
+        self.synced = started
+        self.checked = monotonic()
+
+    def top(self, ingredients, limit):
+        with self.lock:
+            self.sync()
+            return self.index.top(ingredients, limit)
+
+    def forget(self, pks):
+        with self.lock:
+            for pk in pks:
+                self.index.remove_recipe(pk)
+
+
+cookable_index = CookableIndex()
+
+
+def find_cookable_recipes(ingredients, limit):
+    """Рецепты с наибольшей долей ингредиентов из заданного набора.
+
+    У рецептов заполнены атрибуты coverage, matched и total.
+    """
+    while True:
+        ranked = cookable_index.top(ingredients, limit)
+        recipes = Recipe.objects.in_bulk([pk for *_, pk in ranked])
+        missing = [pk for *_, pk in ranked if pk not in recipes]
+        if not missing:
+            break
+        cookable_index.forget(missing)
+    result = []
+    for coverage, matched, total, pk in ranked:
+        recipe = recipes[pk]
+        recipe.coverage = round(coverage, 4)
+        recipe.matched = matched
+        recipe.total = total
+        result.append(recipe)
+    return result
@@ -0,0 +1,53 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно изменяет денормализованный счетчик."""
+    model.objects.filter(pk=pk).update(**{field: F(field) + delta})
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'following'),
+)
+
+
+def ordering_counters(ordering):
+    """Счетчики рецепта, по которым идет сортировка."""
+    fields = {field.lstrip('-') for field in ordering}
+    return [
+        field for model, field, *_ in COUNTERS
+        if model is Recipe and field in fields
+    ]
+
+
+def find_counter_drift():
+    """Количество объектов с неверным значением каждого счетчика."""
+    drift = {}
+    for model, field, source, source_field in COUNTERS:
+        drift[f'{model.__name__}.{field}'] = model.objects.alias(
+            actual=count_subquery(source, source_field)
+        ).filter(~Q(**{field: F('actual')})).count()
+    return drift
+
+
+def recount_counters():
+    """Пересчитывает все денормализованные счетчики."""
+    for model, field, source, source_field in COUNTERS:
+        model.objects.update(**{field: count_subquery(source, source_field)})
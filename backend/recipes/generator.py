@@ -0,0 +1,176 @@
+import os
+import random
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from core.cache import bump_version
+from core.constants import (
+    MAX_AMOUNT_INGREDIENTS,
+    RECIPES_CACHE_VERSION,
+    SYNTHETIC_PASSWORD,
+)
+from recipes.counters import recount_counters
+from recipes.importers import (
+    batched,
+    import_ingredients,
+    import_tags,
+    make_demo_image,
+)
+from recipes.media import acquire_files
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.shopping_list import rebuild_shopping_lists
+from users.models import Subscription, User
+
+
+def ensure_reference_data(batch_size):
+    """Ингредиенты и теги из data/, если база еще пустая."""
+    data_dir = os.path.join(settings.BASE_DIR, 'data')
+    if not Ingredient.objects.exists():
+        import_ingredients(
+            os.path.join(data_dir, 'ingredients.json'), batch_size
+        )
+    if not Tag.objects.exists():
+        import_tags(os.path.join(data_dir, 'tags.json'), batch_size)
+
+
+def create_users(prefix, count, batch_size):
+    password = make_password(SYNTHETIC_PASSWORD)
+    for batch in batched(range(count), batch_size):
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f'{prefix}{number}',
+                    email=f'{prefix}{number}@example.com',
+                    first_name='Тестовый',
+                    last_name=f'Пользователь {number}',
+                    password=password,
+                )
+                for number in batch
+            ),
+            ignore_conflicts=True,
+        )
+    return list(User.objects.filter(
+        username__in=[f'{prefix}{number}' for number in range(count)]
+    ).values_list('id', flat=True))
+
+
+def create_recipes(rng, authors, recipes_per_user, ingredients_per_recipe,
+                   batch_size, progress=None):
+    content = make_demo_image(0)
+    image = default_storage.save('recipes/images/synthetic.jpg', content)
+    content.seek(0)
+    image_hash = sha256(content.read()).hexdigest()
+    ingredients = list(Ingredient.objects.values_list('id', flat=True))
+    tags = list(Tag.objects.values_list('id', flat=True))
+    recipe_ids = []
+    for batch in batched(
+        (author for author in authors for _ in range(recipes_per_user)),
+        batch_size,
+    ):
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author_id=author,
+                name=f'Рецепт {len(recipe_ids) + number}',
+                text='Сгенерированный рецепт для нагрузочного тестирования.',
+                cooking_time=rng.randint(1, 180),
+                image=image,
+                image_hash=image_hash,
+            )
+            for number, author in enumerate(batch)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag)
+            for recipe in recipes
+            for tag in rng.sample(tags, rng.randint(1, min(2, len(tags))))
+        )
+        IngredientRecipe.objects.bulk_create(
+            (
+                IngredientRecipe(
+                    recipe_id=recipe.pk,
+                    name_id=ingredient,
+                    amount=rng.randint(1, MAX_AMOUNT_INGREDIENTS // 100),
+                )
+                for recipe in recipes
+                for ingredient in rng.sample(
+                    ingredients, min(ingredients_per_recipe, len(ingredients))
+                )
+            ),
+            batch_size=batch_size,
+        )
+        recipe_ids.extend(recipe.pk for recipe in recipes)
+        if progress:
+            progress('Рецепты', len(recipe_ids))
+    acquire_files((image,), len(recipe_ids))
+    return recipe_ids
+
+
+def create_links(rng, model, field, users, targets, per_user, batch_size,
+                 exclude_self=False):
+    """Случайные связи пользователей с рецептами или авторами.
+
+    Уже существующие связи пропускаются, поэтому созданные строки
+    считаются по таблице до и после вставки.
+    """
+    def links():
+        for user in users:
+            sample = rng.sample(targets, min(per_user + 1, len(targets)))
+            if exclude_self:
+                sample = [target for target in sample if target != user]
+            for target in sample[:per_user]:
+                yield model(**{'user_id': user, f'{field}_id': target})
+
+    existing = model.objects.count()
+    for batch in batched(links(), batch_size):
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+    return model.objects.count() - existing
+
+
+@transaction.atomic
+def generate_dataset(users, recipes_per_user, ingredients_per_recipe,
+                     favorites_per_user, carts_per_user,
+                     subscriptions_per_user, batch_size, prefix, seed=None,
+                     progress=None):
+    """Синтетический набор данных, созданный пакетными вставками.
+
+    Сигналы при пакетной вставке не срабатывают, поэтому счетчики
+    и списки покупок затем пересчитываются целиком.
+    """
+    rng = random.Random(seed)
+    ensure_reference_data(batch_size)
+    user_ids = create_users(prefix, users, batch_size)
+    if progress:
+        progress('Пользователи', len(user_ids))
+    recipe_ids = create_recipes(
+        rng, user_ids, recipes_per_user, ingredients_per_recipe, batch_size,
+        progress,
+    )
+    stats = {'Пользователи': len(user_ids), 'Рецепты': len(recipe_ids)}
+    for name, model, field, targets, per_user, exclude_self in (
+        ('Избранное', Favorite, 'recipe', recipe_ids, favorites_per_user,
+         False),
+        ('Списки покупок', ShoppingCart, 'recipe', recipe_ids,
+         carts_per_user, False),
+        ('Подписки', Subscription, 'following', user_ids,
+         subscriptions_per_user, True),
+    ):
+        stats[name] = create_links(
+            rng, model, field, user_ids, targets, per_user, batch_size,
+            exclude_self,
+        )
+        if progress:
+            progress(name, stats[name])
+    recount_counters()
+    rebuild_shopping_lists()
+    transaction.on_commit(lambda: bump_version(RECIPES_CACHE_VERSION))
+    return stats
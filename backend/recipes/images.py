@@ -0,0 +1,218 @@
+import logging
+from datetime import timedelta
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.cache import bump_version
+from core.constants import (
+    AVATAR_IMAGE_RENDITIONS,
+    ERROR_IMAGE_TASK_STALE,
+    IMAGE_RENDITION_FORMATS,
+    IMAGE_RENDITIONS_DIR,
+    IMAGE_TASK_MAX_ATTEMPTS,
+    IMAGE_TASK_STALE_SECONDS,
+    RECIPE_IMAGE_RENDITIONS,
+    RECIPE_VERSION,
+    RECIPES_CACHE_VERSION,
+    USER_VERSION,
+)
+from recipes.media import acquire_files, release_files
+from recipes.models import ImageTask, Recipe
+from recipes.versions import touch_recipes_of
+from users.models import User
+
+logger = logging.getLogger('foodgram.images')
+
+TARGETS = {
+    ImageTask.RECIPE: (
+        Recipe, 'image', 'image_renditions', RECIPE_IMAGE_RENDITIONS,
+        RECIPE_VERSION,
+    ),
+    ImageTask.AVATAR: (
+        User, 'avatar', 'avatar_renditions', AVATAR_IMAGE_RENDITIONS,
+        USER_VERSION,
+    ),
+}
+IMAGE_KINDS = {model: kind for kind, (model, *_) in TARGETS.items()}
+RECIPE_LOOKUPS = {ImageTask.RECIPE: 'pk', ImageTask.AVATAR: 'author'}
+
+
+def rendition_files(renditions):
+    return {
+        name
+        for key, rendition in renditions.items() if key != 'source'
+        for image_format, name in rendition.items()
+        if image_format in IMAGE_RENDITION_FORMATS
+    }
+
+
+def sync_renditions(kind, instance):
+    """Ставит изображение в очередь, если оно изменилось.
+
+    Копии прежнего изображения сразу сбрасываются: пока задача
+    не выполнена, клиенты используют исходный файл.
+    Возвращает True, если задача поставлена в очередь.
+    """
+    model, field, renditions_field, *_ = TARGETS[kind]
+    image = getattr(instance, field)
+    renditions = getattr(instance, renditions_field)
+    source = image.name if image else ''
+    if renditions.get('source', '') == source:
+        return False
+    if renditions:
+        model.objects.filter(pk=instance.pk).update(
+            **{renditions_field: {}}
+        )
+        setattr(instance, renditions_field, {})
+        release_files(rendition_files(renditions))
+    if source:
+        ImageTask.objects.update_or_create(
+            kind=kind,
+            object_id=instance.pk,
+            source=source,
+            defaults={'status': ImageTask.PENDING, 'attempts': 0, 'error': ''},
+        )
+    return bool(source)
+
+
+def make_renditions(kind, source):
+    """Уменьшенные копии в форматах WebP и JPEG без метаданных.
+
+    На сохраненные файлы сразу берутся ссылки; при ошибке они отпускаются.
+    """
+    sizes = TARGETS[kind][3]
+    with default_storage.open(source) as file:
+        image = ImageOps.exif_transpose(Image.open(file)).convert('RGB')
+    image.info = {}
+    stem = PurePosixPath(source).stem
+    renditions = {'source': source}
+    acquired = set()
+    try:
+        for name, size in sizes.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            rendition = {'width': resized.width, 'height': resized.height}
+            for image_format, (pil_format, quality) in (
+                IMAGE_RENDITION_FORMATS.items()
+            ):
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, quality=quality)
+                file_name = default_storage.save(
+                    f'{IMAGE_RENDITIONS_DIR}/{kind}/{stem}_{name}.'
+                    f'{image_format}',
+                    ContentFile(buffer.getvalue()),
+                )
+                if file_name not in acquired:
+                    acquire_files((file_name,))
+                    acquired.add(file_name)
+                rendition[image_format] = file_name
+            renditions[name] = rendition
+    except Exception:
+        release_files(acquired)
+        raise
+    return renditions
+
+
+def available_tasks():
+    stale = timezone.now() - timedelta(seconds=IMAGE_TASK_STALE_SECONDS)
+    return ImageTask.objects.filter(
+        Q(status=ImageTask.PENDING)
+        | Q(status=ImageTask.PROCESSING, updated__lt=stale),
+        attempts__lt=IMAGE_TASK_MAX_ATTEMPTS,
+    )
+
+
+def claim_tasks(limit):
+    """Забирает задачи из очереди условным UPDATE.
+
+    Задачу получает только тот обработчик, чей UPDATE изменил строку,
+    поэтому несколько обработчиков не берут одну задачу дважды.
+    Зависшие задачи упавших обработчиков возвращаются в работу по таймауту,
+    а исчерпавшие попытки помечаются ошибкой.
+    """
+    stale = timezone.now() - timedelta(seconds=IMAGE_TASK_STALE_SECONDS)
+    ImageTask.objects.filter(
+        status=ImageTask.PROCESSING,
+        updated__lt=stale,
+        attempts__gte=IMAGE_TASK_MAX_ATTEMPTS,
+    ).update(
+        status=ImageTask.FAILED,
+        error=ERROR_IMAGE_TASK_STALE,
+        updated=timezone.now(),
+    )
+    claimed = []
+    for pk in available_tasks().values_list('pk', flat=True)[:limit]:
+        if available_tasks().filter(pk=pk).update(
+            status=ImageTask.PROCESSING,
+            attempts=F('attempts') + 1,
+            updated=timezone.now(),
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def save_renditions(task):
+    model, field, renditions_field, _, version = TARGETS[task.kind]
+    renditions = make_renditions(task.kind, task.source)
+    if model.objects.filter(
+        pk=task.object_id, **{field: task.source}
+    ).update(**{renditions_field: renditions}):
+        bump_version(RECIPES_CACHE_VERSION)
+        bump_version(version.format(task.object_id))
+        touch_recipes_of(**{RECIPE_LOOKUPS[task.kind]: task.object_id})
+    else:
+        release_files(rendition_files(renditions))
+
+
+def process_task(pk):
+    """Выполняет задачу; возвращает True, если копии сохранены.
+
+    Любая ошибка записывается в задачу, а задача возвращается в очередь
+    или, если попытки исчерпаны, помечается ошибкой, чтобы не остаться
+    в обработке.
+    """
+    try:
+        task = ImageTask.objects.filter(pk=pk).first()
+        if task is None:
+            return False
+        try:
+            save_renditions(task)
+        except Exception as error:
+            logger.exception('Ошибка обработки изображения %s', task.source)
+            ImageTask.objects.filter(pk=pk).update(
+                status=(
+                    ImageTask.FAILED
+                    if task.attempts >= IMAGE_TASK_MAX_ATTEMPTS
+                    else ImageTask.PENDING
+                ),
+                error=f'{type(error).__name__}: {error}',
+                updated=timezone.now(),
+            )
+            return False
+        ImageTask.objects.filter(pk=pk).update(
+            status=ImageTask.DONE, error='', updated=timezone.now()
+        )
+        return True
+    finally:
+        connection.close()
+
+
+def enqueue_missing():
+    """Ставит в очередь все изображения без уменьшенных копий."""
+    count = 0
+    for kind, (model, field, renditions_field, *_) in TARGETS.items():
+        instances = model.objects.exclude(
+            **{field: ''}
+        ).exclude(
+            **{f'{field}__isnull': True}
+        ).only('pk', field, renditions_field)
+        for instance in instances.iterator():
+            count += sync_renditions(kind, instance)
+    return count
@@ -0,0 +1,198 @@
+import csv
+import json
+import re
+from functools import partial
+from io import BytesIO
+from itertools import islice
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from core.cache import bump_version
+from core.constants import (
+    DEMO_AUTHOR_EMAIL,
+    DEMO_AUTHOR_USERNAME,
+    DEMO_IMAGE_COLORS,
+    DEMO_IMAGE_SIZE,
+    IMPORT_READ_SIZE,
+    INGREDIENTS_VERSION,
+    RECIPES_CACHE_VERSION,
+    TAGS_VERSION,
+)
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def iter_json_array(file, read_size=IMPORT_READ_SIZE):
+    """Потоковый разбор JSON-массива без чтения файла целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    for chunk in iter(partial(file.read, read_size), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            position = SEPARATORS.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError('Ожидался JSON-массив')
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item
+    raise ValueError('Неожиданный конец JSON-массива')
+
+
+def iter_csv_rows(file, fields):
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+def read_records(path, fields):
+    """Записи из файла JSON или CSV (в CSV поля идут в порядке fields)."""
+    with open(path, encoding='utf-8', newline='') as file:
+        if Path(path).suffix.lower() == '.csv':
+            yield from iter_csv_rows(file, fields)
+        else:
+            yield from iter_json_array(file)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_import(model, objects, batch_size, progress=None):
+    """Пакетная вставка с пропуском уже существующих записей.
+
+    Возвращает количество обработанных и добавленных записей.
+    """
+    before = model.objects.count()
+    processed = 0
+    for batch in batched(objects, batch_size):
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+        processed += len(batch)
+        if progress:
+            progress(processed)
+    return processed, model.objects.count() - before
+
+
+def import_ingredients(path, batch_size, progress=None):
+    result = bulk_import(
+        Ingredient,
+        (
+            Ingredient(
+                name=record['name'].strip(),
+                measurement_unit=record['measurement_unit'].strip(),
+            )
+            for record in read_records(path, ('name', 'measurement_unit'))
+        ),
+        batch_size,
+        progress,
+    )
+    bump_version(INGREDIENTS_VERSION)
+    return result
+
+
+def import_tags(path, batch_size, progress=None):
+    result = bulk_import(
+        Tag,
+        (
+            Tag(name=record['name'].strip(), slug=record['slug'].strip())
+            for record in read_records(path, ('name', 'slug'))
+        ),
+        batch_size,
+        progress,
+    )
+    bump_version(TAGS_VERSION)
+    return result
+
+
+def make_demo_image(number):
+    buffer = BytesIO()
+    color = DEMO_IMAGE_COLORS[number % len(DEMO_IMAGE_COLORS)]
+    Image.new('RGB', DEMO_IMAGE_SIZE, color).save(buffer, 'JPEG')
+    return ContentFile(buffer.getvalue(), name='demo.jpg')
+
+
+def get_demo_author():
+    author, _ = User.objects.get_or_create(
+        email=DEMO_AUTHOR_EMAIL,
+        defaults={
+            'username': DEMO_AUTHOR_USERNAME,
+            'first_name': 'Демо',
+            'last_name': 'Автор',
+        },
+    )
+    return author
+
+
+@transaction.atomic
+def import_demo_recipes(path, batch_size=None, progress=None):
+    """Демонстрационные рецепты; уже загруженные пропускаются.
+
+    Рецептов немного, поэтому они сохраняются по одному, чтобы сработали
+    сигналы счетчиков, кэша и обработки изображений.
+    """
+    records = list(read_records(path, ()))
+    author = get_demo_author()
+    existing = set(Recipe.objects.filter(
+        author=author
+    ).values_list('name', flat=True))
+    tags = {tag.slug: tag for tag in Tag.objects.all()}
+    ingredients = {
+        (ingredient.name, ingredient.measurement_unit): ingredient
+        for ingredient in Ingredient.objects.filter(
+            name__in={
+                item['name']
+                for record in records for item in record['ingredients']
+            }
+        )
+    }
+    created = 0
+    for number, record in enumerate(records, 1):
+        if record['name'] in existing:
+            continue
+        recipe = Recipe.objects.create(
+            author=author,
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=make_demo_image(number),
+        )
+        try:
+            recipe.tags.set(tags[slug] for slug in record['tags'])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(
+                    recipe=recipe,
+                    name=ingredients[item['name'], item['measurement_unit']],
+                    amount=item['amount'],
+                )
+                for item in record['ingredients']
+            )
+        except KeyError as error:
+            raise ValueError(
+                f'Рецепт «{record["name"]}»: не найден тег или '
+                f'ингредиент {error}'
+            )
+        created += 1
+        if progress:
+            progress(number)
+    transaction.on_commit(lambda: bump_version(RECIPES_CACHE_VERSION))
+    return len(records), created
@@ -0,0 +1,137 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from api.benchmark import SCENARIOS, compare, make_context, run_scenario
+from core.constants import (
+    BENCHMARK_ALLOC_ITERATIONS,
+    BENCHMARK_HOST,
+    BENCHMARK_ITERATIONS,
+    BENCHMARK_RECIPES_SAMPLE,
+    BENCHMARK_WARMUP,
+    SYNTHETIC_PREFIX,
+)
+from users.models import User
+
+SCENARIO_NAMES = tuple(scenario.name for scenario in SCENARIOS)
+
+
+class Command(BaseCommand):
+    """Команда нагрузочного тестирования основных эндпоинтов API."""
+
+    help = (
+        'Задержки p50/p95, запросы к БД и выделения памяти по сценариям API '
+        'с сохранением и сравнением базовых результатов'
+    )
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('iterations', BENCHMARK_ITERATIONS, 'Замеров на сценарий'),
+            ('warmup', BENCHMARK_WARMUP, 'Прогревочных запросов'),
+            ('alloc-iterations', BENCHMARK_ALLOC_ITERATIONS,
+             'Запросов для замера памяти'),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text
+            )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=SCENARIO_NAMES,
+            default=SCENARIO_NAMES,
+            help='Запустить только указанные сценарии',
+        )
+        parser.add_argument(
+            '--user',
+            default=f'{SYNTHETIC_PREFIX}0',
+            help='Пользователь для авторизованных сценариев',
+        )
+        parser.add_argument(
+            '--host',
+            default=BENCHMARK_HOST,
+            help='Значение заголовка Host, на время замеров он разрешен',
+        )
+        parser.add_argument(
+            '--save-baseline', help='Сохранить результаты в файл JSON'
+        )
+        parser.add_argument(
+            '--baseline', help='Сравнить с результатами из файла JSON'
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            help='Допустимый рост p95 в процентах относительно базовых',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(
+                f'Пользователь {options["user"]} не найден, '
+                'сначала выполните generate_data'
+            )
+        context = make_context(user, BENCHMARK_RECIPES_SAMPLE)
+        results = {}
+        self.stdout.write(
+            f'{"Сценарий":<24}{"код":>8}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"запросы":>10}{"память, КиБ":>14}'
+        )
+        allowed_hosts = [*settings.ALLOWED_HOSTS, options['host']]
+        for scenario in SCENARIOS:
+            if scenario.name not in options['only']:
+                continue
+            with override_settings(ALLOWED_HOSTS=allowed_hosts):
+                result = run_scenario(
+                    scenario,
+                    context,
+                    options['host'],
+                    options['iterations'],
+                    options['warmup'],
+                    options['alloc_iterations'],
+                )
+            results[scenario.name] = result
+            self.stdout.write(
+                f'{scenario.name:<24}'
+                f'{",".join(map(str, result["status"])):>8}'
+                f'{result["p50_ms"]:>10}{result["p95_ms"]:>10}'
+                f'{result["queries"]:>10}{result["alloc_kib"]!s:>14}'
+            )
+        if options['save_baseline']:
+            Path(options['save_baseline']).write_text(json.dumps(
+                {
+                    'database': connection.vendor,
+                    'iterations': options['iterations'],
+                    'results': results,
+                },
+                ensure_ascii=False,
+                indent=2,
+            ), encoding='utf-8')
+            self.stdout.write(
+                f'Результаты сохранены в {options["save_baseline"]}'
+            )
+        if options['baseline']:
+            self.compare(results, options['baseline'],
+                         options['max_regression'])
+
+    def compare(self, results, path, max_regression):
+        try:
+            baseline = json.loads(
+                Path(path).read_text(encoding='utf-8')
+            )['results']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        rows, regressions = compare(results, baseline, max_regression)
+        for name, previous, result, change in rows:
+            self.stdout.write(
+                f'{name:<24}p95 {previous["p95_ms"]} → {result["p95_ms"]} '
+                f'({change:+.0f}%), запросы {previous["queries"]} → '
+                f'{result["queries"]}'
+            )
+        if regressions:
+            raise CommandError(
+                'Регрессии производительности:\n' + '\n'.join(regressions)
+            )
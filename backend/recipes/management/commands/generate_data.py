@@ -0,0 +1,61 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from core.constants import IMPORT_BATCH_SIZE, SYNTHETIC_PREFIX
+from recipes.generator import generate_dataset
+
+
+class Command(BaseCommand):
+    """Команда генерации синтетических данных для нагрузочных тестов."""
+
+    help = (
+        'Генерация пользователей, рецептов, избранного, списков покупок '
+        'и подписок пакетными вставками'
+    )
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('users', 100, 'Количество пользователей'),
+            ('recipes-per-user', 10, 'Рецептов у каждого пользователя'),
+            ('ingredients-per-recipe', 8, 'Ингредиентов в рецепте'),
+            ('favorites-per-user', 20, 'Рецептов в избранном'),
+            ('carts-per-user', 5, 'Рецептов в списке покупок'),
+            ('subscriptions-per-user', 10, 'Подписок у пользователя'),
+            ('batch-size', IMPORT_BATCH_SIZE, 'Записей в одной вставке'),
+        ):
+            parser.add_argument(
+                f'--{name}', type=int, default=default, help=help_text
+            )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Начальное значение генератора для воспроизводимости',
+        )
+        parser.add_argument(
+            '--prefix',
+            default=SYNTHETIC_PREFIX,
+            help='Префикс имен сгенерированных пользователей',
+        )
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        stats = generate_dataset(
+            users=options['users'],
+            recipes_per_user=options['recipes_per_user'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            favorites_per_user=options['favorites_per_user'],
+            carts_per_user=options['carts_per_user'],
+            subscriptions_per_user=options['subscriptions_per_user'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            progress=lambda name, count: self.stdout.write(
+                f'{name}: {count}'
+            ),
+        )
+        for name, count in stats.items():
+            self.stdout.write(f'{name}: создано {count}')
+        self.stdout.write(
+            f'Данные сгенерированы за {perf_counter() - started:.2f} с!'
+        )
@@ -1,38 +1,77 @@
-import json
 import os
+from time import perf_counter
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db.utils import IntegrityError
 
+from core.constants import IMPORT_BATCH_SIZE
 from foodgram_backend.settings import BASE_DIR
-from recipes.models import Ingredient
+from recipes.importers import (
+    import_demo_recipes,
+    import_ingredients,
+    import_tags,
+)
+
+DATASETS = {
+    'ingredients': ('ingredients.json', import_ingredients, 'Ингредиенты'),
+    'tags': ('tags.json', import_tags, 'Теги'),
+    'recipes': ('recipes.json', import_demo_recipes, 'Рецепты'),
+}
 
 
 class Command(BaseCommand):
-    """Команда заполнение базы данных ингредиентов"""
+    """Команда заполнение базы данных ингредиентов, тегов и рецептов"""
+
+    help = (
+        'Пакетная загрузка ингредиентов, тегов и демонстрационных рецептов; '
+        'повторный запуск не создает дубликатов'
+    )
 
-    help = 'Загрузка данных для ингредиентов'
+    def add_arguments(self, parser):
+        for name, (filename, _, verbose_name) in DATASETS.items():
+            parser.add_argument(
+                f'--{name}',
+                default=os.path.join(BASE_DIR, 'data', filename),
+                help=f'{verbose_name}: путь к файлу JSON или CSV',
+            )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            choices=tuple(DATASETS),
+            default=tuple(DATASETS),
+            help='Загрузить только указанные наборы данных',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help='Количество записей в одной вставке',
+        )
 
     def handle(self, *args, **options):
-        try:
-            with open(
-                os.path.join(
-                    BASE_DIR,
-                    'data/ingredients.json'
-                ),
-                'r',
-                encoding='utf-8'
-            ) as data:
-                data = json.load(data)
-                for ingredient in data:
-                    try:
-                        Ingredient.objects.create(
-                            name=ingredient['name'],
-                            measurement_unit=ingredient['measurement_unit']
-                        )
-
-                    except IntegrityError:
-                        pass
-                self.stdout.write('Загрузка данных завершена!')
-        except FileNotFoundError:
-            raise CommandError('Файл ingredients.json не найден!')
+        started = perf_counter()
+        for name in DATASETS:
+            if name not in options['only']:
+                continue
+            _, load, verbose_name = DATASETS[name]
+            path = options[name]
+            load_started = perf_counter()
+            try:
+                processed, created = load(
+                    path,
+                    options['batch_size'],
+                    lambda count: self.stdout.write(
+                        f'{verbose_name}: обработано {count}'
+                    ),
+                )
+            except FileNotFoundError:
+                raise CommandError(f'Файл {path} не найден!')
+            except (KeyError, ValueError) as error:
+                raise CommandError(f'Ошибка в файле {path}: {error}')
+            self.stdout.write(
+                f'{verbose_name}: обработано {processed}, '
+                f'добавлено {created} '
+                f'за {perf_counter() - load_started:.2f} с'
+            )
+        self.stdout.write(
+            f'Загрузка данных завершена за {perf_counter() - started:.2f} с!'
+        )
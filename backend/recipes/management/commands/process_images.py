@@ -0,0 +1,66 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.constants import (
+    IMAGE_WORKER_BATCH_SIZE,
+    IMAGE_WORKER_POLL_SECONDS,
+    IMAGE_WORKERS,
+)
+from recipes.images import claim_tasks, enqueue_missing, process_task
+
+
+class Command(BaseCommand):
+    """Команда фоновой обработки изображений из очереди в базе данных."""
+
+    help = 'Создание уменьшенных копий изображений рецептов и аватаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=IMAGE_WORKERS,
+            help='Количество потоков обработки',
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=IMAGE_WORKER_BATCH_SIZE,
+            help='Количество задач, забираемых из очереди за раз',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=IMAGE_WORKER_POLL_SECONDS,
+            help='Пауза между опросами пустой очереди в секундах',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь и завершиться',
+        )
+        parser.add_argument(
+            '--enqueue-missing',
+            action='store_true',
+            help='Поставить в очередь все изображения без копий',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            self.stdout.write(
+                f'Поставлено в очередь изображений: {enqueue_missing()}'
+            )
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            while True:
+                tasks = claim_tasks(options['batch'])
+                if tasks:
+                    processed = sum(executor.map(process_task, tasks))
+                    self.stdout.write(
+                        f'Обработано изображений: {processed} '
+                        f'из {len(tasks)}'
+                    )
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll'])
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.shopping_list import find_drift, rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    """Команда пересборки списков покупок."""
+
+    help = 'Пересборка и проверка сумм ингредиентов в списках покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не изменяя',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_drift()
+            for user, ingredient, amount, expected in drift:
+                self.stdout.write(
+                    f'Пользователь {user}, ингредиент {ingredient}: '
+                    f'{amount} вместо {expected}'
+                )
+            if drift:
+                raise CommandError(f'Найдено расхождений: {len(drift)}')
+            self.stdout.write('Расхождений не найдено.')
+            return
+        with transaction.atomic():
+            rebuild_shopping_lists()
+        self.stdout.write('Списки покупок пересобраны!')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import find_counter_drift, recount_counters
+
+
+class Command(BaseCommand):
+    """Команда сверки денормализованных счетчиков."""
+
+    help = 'Сверка и пересчет счетчиков избранного, покупок и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не изменяя',
+        )
+
+    def handle(self, *args, **options):
+        drift = find_counter_drift()
+        for counter, count in drift.items():
+            if count:
+                self.stdout.write(f'{counter}: расхождений {count}')
+        if options['check']:
+            if any(drift.values()):
+                raise CommandError('Найдены расхождения счетчиков!')
+            self.stdout.write('Расхождений не найдено.')
+            return
+        with transaction.atomic():
+            recount_counters()
+        self.stdout.write('Счетчики пересчитаны!')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.constants import TRENDING_HALF_LIFE_HOURS, TRENDING_WINDOW_DAYS
+from recipes.trending import update_trending_scores
+
+
+class Command(BaseCommand):
+    """Команда пересчета рейтинга популярных рецептов."""
+
+    help = 'Пересчет рейтинга trending, запускается периодически (cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-life',
+            type=float,
+            default=TRENDING_HALF_LIFE_HOURS,
+            help='Период полураспада рейтинга в часах',
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=TRENDING_WINDOW_DAYS,
+            help='Учитываемый период активности в днях',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = update_trending_scores(
+                half_life_hours=options['half_life'],
+                window_days=options['window'],
+            )
+        self.stdout.write(f'Рейтинг обновлен для рецептов: {updated}')
@@ -0,0 +1,65 @@
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+
+from recipes.models import MediaFile
+
+
+def acquire_files(names, count=1):
+    """Увеличивает счетчики ссылок на файлы.
+
+    Строки счетчиков блокируются, поэтому ссылка появляется либо до
+    проверки в delete_files, и файл остается, либо после удаления файла.
+    Во втором случае загрузка, совпавшая по хэшу с удаляемым файлом,
+    прерывается FileNotFoundError вместо ссылки на пропавший файл.
+    """
+    names = set(filter(None, names))
+    if not names:
+        return
+    with transaction.atomic():
+        MediaFile.objects.bulk_create(
+            (MediaFile(name=name) for name in names), ignore_conflicts=True
+        )
+        deleted = names - set(MediaFile.objects.select_for_update().filter(
+            name__in=names
+        ).order_by('name').values_list('name', flat=True))
+        for name in deleted:
+            if not default_storage.exists(name):
+                raise FileNotFoundError(name)
+        MediaFile.objects.bulk_create(
+            (MediaFile(name=name) for name in deleted), ignore_conflicts=True
+        )
+        MediaFile.objects.filter(
+            name__in=names
+        ).update(references=F('references') + count)
+
+
+def release_files(names):
+    """Уменьшает счетчики ссылок и удаляет файлы, оставшиеся без ссылок.
+
+    Строки с нулевым счетчиком остаются до фиксации транзакции:
+    delete_files блокирует их, заново проверяет счетчик и удаляет файл
+    вместе со строкой, только если новых ссылок так и не появилось.
+    """
+    names = set(filter(None, names))
+    if not names:
+        return
+    MediaFile.objects.filter(
+        name__in=names, references__gt=0
+    ).update(references=F('references') - 1)
+    unreferenced = names - set(MediaFile.objects.filter(
+        name__in=names, references__gt=0
+    ).values_list('name', flat=True))
+    if not unreferenced:
+        return
+
+    def delete_files():
+        with transaction.atomic():
+            names = list(MediaFile.objects.select_for_update().filter(
+                name__in=unreferenced, references=0
+            ).order_by('name').values_list('name', flat=True))
+            for name in names:
+                default_storage.delete(name)
+            MediaFile.objects.filter(name__in=names).delete()
+
+    transaction.on_commit(delete_files)
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.20 on 2026-10-18 06:33
+
+from collections import Counter
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def rendition_files(renditions):
+    return {
+        name
+        for key, rendition in renditions.items() if key != 'source'
+        for image_format, name in rendition.items()
+        if image_format in ('webp', 'jpeg')
+    }
+
+
+def fill_media_files(apps, schema_editor):
+    MediaFile = apps.get_model('recipes', 'MediaFile')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    User = apps.get_model('users', 'User')
+    references = Counter()
+    for model, field, renditions_field in (
+        (Recipe, 'image', 'image_renditions'),
+        (User, 'avatar', 'avatar_renditions'),
+    ):
+        for name, renditions in model.objects.values_list(
+            field, renditions_field
+        ).iterator():
+            references.update({name, *rendition_files(renditions or {})})
+    references.pop('', None)
+    references.pop(None, None)
+    MediaFile.objects.bulk_create(
+        (
+            MediaFile(name=name, references=count)
+            for name, count in references.items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_image_renditions'),
+        ('users', '0004_user_avatar_renditions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, unique=True, verbose_name='Имя файла')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Количество ссылок')),
+            ],
+            options={
+                'verbose_name': 'файл',
+                'verbose_name_plural': 'Файлы',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.RunPython(fill_media_files, migrations.RunPython.noop),
+    ]
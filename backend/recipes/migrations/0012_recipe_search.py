@@ -0,0 +1,191 @@
+# Generated by Django 4.2.20 on 2026-10-18 10:40
+
+from django.db import migrations
+
+POSTGRES_FORWARD = (
+    'ALTER TABLE recipes_recipe '
+    'ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    """
+    CREATE OR REPLACE FUNCTION recipes_recipe_search_vector(
+        bigint, text, text
+    ) RETURNS tsvector LANGUAGE sql STABLE AS $$
+        SELECT
+            setweight(to_tsvector('russian', coalesce($2, '')), 'A')
+            || setweight(to_tsvector('simple', coalesce($2, '')), 'A')
+            || setweight(to_tsvector('russian', coalesce(names, '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(names, '')), 'B')
+            || setweight(to_tsvector('russian', coalesce($3, '')), 'C')
+            || setweight(to_tsvector('simple', coalesce($3, '')), 'D')
+        FROM (
+            SELECT string_agg(ingredient.name, ' ') AS names
+            FROM recipes_ingredientrecipe AS item
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = item.name_id
+            WHERE item.recipe_id = $1
+        ) AS ingredients
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION recipes_recipe_search_row()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.search_vector := recipes_recipe_search_vector(
+            NEW.id, NEW.name, NEW.text
+        );
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION recipes_recipe_search_items()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE recipes_recipe AS recipe
+        SET search_vector = recipes_recipe_search_vector(
+            recipe.id, recipe.name, recipe.text
+        )
+        WHERE recipe.id IN (SELECT recipe_id FROM changed_items);
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION recipes_recipe_search_ingredient()
+    RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE recipes_recipe AS recipe
+        SET search_vector = recipes_recipe_search_vector(
+            recipe.id, recipe.name, recipe.text
+        )
+        WHERE recipe.id IN (
+            SELECT recipe_id FROM recipes_ingredientrecipe
+            WHERE name_id = NEW.id
+        );
+        RETURN NULL;
+    END
+    $$
+    """,
+    'CREATE TRIGGER recipes_recipe_search '
+    'BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe '
+    'FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_row()',
+    'CREATE TRIGGER recipes_recipe_search_items_insert '
+    'AFTER INSERT ON recipes_ingredientrecipe '
+    'REFERENCING NEW TABLE AS changed_items '
+    'FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_search_items()',
+    'CREATE TRIGGER recipes_recipe_search_items_update '
+    'AFTER UPDATE ON recipes_ingredientrecipe '
+    'REFERENCING NEW TABLE AS changed_items '
+    'FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_search_items()',
+    'CREATE TRIGGER recipes_recipe_search_items_delete '
+    'AFTER DELETE ON recipes_ingredientrecipe '
+    'REFERENCING OLD TABLE AS changed_items '
+    'FOR EACH STATEMENT EXECUTE FUNCTION recipes_recipe_search_items()',
+    'CREATE TRIGGER recipes_recipe_search_ingredient '
+    'AFTER UPDATE OF name ON recipes_ingredient '
+    'FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name) '
+    'EXECUTE FUNCTION recipes_recipe_search_ingredient()',
+    'UPDATE recipes_recipe SET search_vector = '
+    'recipes_recipe_search_vector(id, name, text)',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+)
+POSTGRES_BACKWARD = (
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_ingredient '
+    'ON recipes_ingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_items_delete '
+    'ON recipes_ingredientrecipe',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_items_update '
+    'ON recipes_ingredientrecipe',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search_items_insert '
+    'ON recipes_ingredientrecipe',
+    'DROP TRIGGER IF EXISTS recipes_recipe_search ON recipes_recipe',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_ingredient()',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_items()',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_row()',
+    'DROP FUNCTION IF EXISTS recipes_recipe_search_vector(bigint, text, text)',
+    'DROP INDEX IF EXISTS recipes_recipe_search_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+
+SQLITE_INGREDIENT_NAMES = """
+    SELECT group_concat(ingredient.name, ' ')
+    FROM recipes_ingredientrecipe AS item
+    JOIN recipes_ingredient AS ingredient ON ingredient.id = item.name_id
+    WHERE item.recipe_id = {}
+"""
+SQLITE_UPDATE_INGREDIENTS = (
+    'UPDATE recipes_recipe_fts SET ingredients = coalesce(('
+    + SQLITE_INGREDIENT_NAMES.format('recipes_recipe_fts.rowid')
+    + "), '') WHERE rowid IN ({});"
+)
+SQLITE_FORWARD = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS recipes_recipe_fts USING fts5('
+    "name, ingredients, text, tokenize = 'unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_insert '
+    'AFTER INSERT ON recipes_recipe BEGIN '
+    'INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text) '
+    "VALUES (new.id, new.name, '', new.text); END",
+    'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_update '
+    'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+    'UPDATE recipes_recipe_fts SET name = new.name, text = new.text '
+    'WHERE rowid = new.id; END',
+    'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_delete '
+    'AFTER DELETE ON recipes_recipe BEGIN '
+    'DELETE FROM recipes_recipe_fts WHERE rowid = old.id; END',
+    'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_items_insert '
+    'AFTER INSERT ON recipes_ingredientrecipe BEGIN '
+    + SQLITE_UPDATE_INGREDIENTS.format('new.recipe_id') + ' END',
+    'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_items_update '
+    'AFTER UPDATE OF name_id ON recipes_ingredientrecipe BEGIN '
+    + SQLITE_UPDATE_INGREDIENTS.format('new.recipe_id') + ' END',
+    'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_items_delete '
+    'AFTER DELETE ON recipes_ingredientrecipe BEGIN '
+    + SQLITE_UPDATE_INGREDIENTS.format('old.recipe_id') + ' END',
+    'CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_ingredient '
+    'AFTER UPDATE OF name ON recipes_ingredient BEGIN '
+    + SQLITE_UPDATE_INGREDIENTS.format(
+        'SELECT recipe_id FROM recipes_ingredientrecipe '
+        'WHERE name_id = new.id'
+    ) + ' END',
+    'INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text) '
+    "SELECT id, name, coalesce((" + SQLITE_INGREDIENT_NAMES.format(
+        'recipes_recipe.id'
+    ) + "), ''), text FROM recipes_recipe",
+)
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_ingredient',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_items_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_items_update',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_items_insert',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_update',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_insert',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+)
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_alter_recipe_short_link'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({
+                'postgresql': POSTGRES_FORWARD,
+                'sqlite': SQLITE_FORWARD,
+            }),
+            run_for_vendor({
+                'postgresql': POSTGRES_BACKWARD,
+                'sqlite': SQLITE_BACKWARD,
+            }),
+        ),
+    ]
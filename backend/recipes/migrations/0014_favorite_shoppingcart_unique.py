@@ -0,0 +1,61 @@
+# Generated by Django 4.2.20 on 2026-10-18 07:33
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def remove_duplicates(apps, schema_editor):
+    """Удаляет повторы пары рецепт-пользователь перед ограничением.
+
+    Ограничение из абстрактной модели не попадало в базу, и повторы
+    могли оставить генератор синтетических данных или гонка запросов.
+    Счетчики рецептов пересчитываются здесь же, списки покупок после
+    удаления повторов пересобирает команда rebuild_shopping_lists.
+    """
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for name, counter in (
+        ('Favorite', 'favorites_count'),
+        ('ShoppingCart', 'in_carts_count'),
+    ):
+        model = apps.get_model('recipes', name)
+        keep = (
+            model.objects.order_by()
+            .values('recipe', 'user')
+            .annotate(first=Min('pk'))
+            .values('first')
+        )
+        deleted, _ = model.objects.exclude(pk__in=keep).delete()
+        if deleted:
+            Recipe.objects.update(
+                **{counter: count_subquery(model, 'recipe')}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_tags_tag_recipe_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='favorite_unique_recipe_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='shoppingcart_unique_recipe_user'),
+        ),
+    ]
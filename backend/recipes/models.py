@@ -1,9 +1,9 @@
-import uuid
-
-from django.db import models, IntegrityError
+from django.db import models
 
 from core.constants import (
-    MAX_ATTEMPTS,
+    IMAGE_HASH_LENGTH,
+    IMAGE_TASK_KIND_MAX_LENGTH,
+    IMAGE_TASK_STATUS_MAX_LENGTH,
     MEASUREMENT_UNIT,
     NAME_MAX_LENGTH,
     SHORT_LINK_MAX_LENGTH,
@@ -78,6 +78,18 @@ class Recipe(models.Model):
         verbose_name='Изображение рецепта',
         help_text='Выберите изображение для рецепта'
     )
+    image_hash = models.CharField(
+        max_length=IMAGE_HASH_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name='Хэш содержимого изображения',
+    )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения',
+    )
     text = models.TextField(
         verbose_name='Описание блюда',
         help_text='Введите описание для блюда'
@@ -91,10 +103,23 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Дата изменения',
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия рецепта',
+    )
     short_link = models.CharField(
         max_length=SHORT_LINK_MAX_LENGTH,
         unique=True,
+        null=True,
         blank=True,
+        editable=False,
+        verbose_name='Прежняя короткая ссылка',
     )
     tags = models.ManyToManyField(
         Tag,
@@ -110,30 +135,52 @@ class Recipe(models.Model):
         through='IngredientRecipe',
         verbose_name='Ингридиенты',
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество добавлений в избранное',
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество добавлений в список покупок',
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Рейтинг популярности за последнее время',
+    )
 
     class Meta:
         default_related_name = 'recipes'
         ordering = ('-pub_date', 'name')
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', 'name'), name='recipe_pub_date_idx'
+            ),
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-pub_date'),
+                name='recipe_popular_idx',
+            ),
+            models.Index(
+                fields=('-trending_score', '-pub_date'),
+                name='recipe_trending_idx',
+            ),
+            models.Index(
+                fields=('cooking_time', '-pub_date'),
+                name='recipe_cooking_time_idx',
+            ),
+        )
 
     def save(self, *args, **kwargs):
-        if not self.short_link:
-            for attempt in range(MAX_ATTEMPTS):
-                try:
-                    self.short_link = self.generate_short_link()
-                    super().save(*args, **kwargs)
-                    break
-                except IntegrityError:
-                    if attempt == MAX_ATTEMPTS - 1:
-                        raise
-                    pass
-            else:
-                super().save(*args, **kwargs)
-
-    def generate_short_link(self):
-        unique_id = str(uuid.uuid4())[:SHORT_LINK_MAX_LENGTH]
-        return unique_id
+        if not self._state.adding:
+            self.version += 1
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.name}. Автор: {self.author.username}'
@@ -190,6 +237,11 @@ class FavoriteShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name='%(class)s_recipe',
     )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         abstract = True
@@ -209,6 +261,7 @@ class Favorite(FavoriteShoppingCart):
         abstract = False
         verbose_name = 'Рецепт в избранном'
         verbose_name_plural = 'Рецепты в избранном'
+        constraints = FavoriteShoppingCart.Meta.constraints
 
     def __str__(self):
         return f'{self.recipe.name} в избранном {self.user.username}'
@@ -221,9 +274,141 @@ class ShoppingCart(FavoriteShoppingCart):
         abstract = False
         verbose_name = 'Рецепт в списке покупок'
         verbose_name_plural = 'Рецепты в списке покупок'
+        constraints = FavoriteShoppingCart.Meta.constraints
 
     def __str__(self):
         return (
             f'Рецепт {self.recipe.name} в списке '
             f'покупок пользователя: {self.user.username}'
         )
+
+
+class ShoppingListItem(models.Model):
+    """Модель суммарного количества ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+
+    class Meta:
+        ordering = ('user', 'ingredient',)
+        verbose_name = 'ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient.name} для {self.user.username}'
+
+
+class ImageTask(models.Model):
+    """Модель задачи фоновой обработки изображения."""
+
+    RECIPE = 'recipe'
+    AVATAR = 'avatar'
+    KIND_CHOICES = (
+        (RECIPE, 'Изображение рецепта'),
+        (AVATAR, 'Аватар пользователя'),
+    )
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (PROCESSING, 'Обрабатывается'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    kind = models.CharField(
+        max_length=IMAGE_TASK_KIND_MAX_LENGTH,
+        choices=KIND_CHOICES,
+        verbose_name='Тип изображения',
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name='Идентификатор объекта',
+    )
+    source = models.CharField(
+        max_length=NAME_MAX_LENGTH,
+        verbose_name='Исходный файл',
+    )
+    status = models.CharField(
+        max_length=IMAGE_TASK_STATUS_MAX_LENGTH,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name='Статус',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Количество попыток',
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата создания',
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+
+    class Meta:
+        ordering = ('created',)
+        verbose_name = 'задача обработки изображения'
+        verbose_name_plural = 'Задачи обработки изображений'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('kind', 'object_id', 'source'),
+                name='unique_image_task',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('status', 'created'), name='image_task_status_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id}: {self.source}'
+
+
+class MediaFile(models.Model):
+    """Модель счетчика ссылок на файл в хранилище."""
+
+    name = models.CharField(
+        max_length=NAME_MAX_LENGTH,
+        unique=True,
+        verbose_name='Имя файла',
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество ссылок',
+    )
+
+    class Meta:
+        ordering = ('name',)
+        verbose_name = 'файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
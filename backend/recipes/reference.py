@@ -0,0 +1,93 @@
+from time import monotonic
+
+from django.conf import settings
+
+from core.cache import bump_version, get_version
+from core.constants import (
+    INGREDIENTS_VERSION,
+    RECIPES_CACHE_VERSION,
+    TAGS_VERSION,
+)
+from recipes.models import Ingredient, Tag
+
+
+class ReferenceTable:
+    """Справочная таблица, закэшированная в памяти процесса.
+
+    Таблица перечитывается из базы, когда меняется общая версия в кэше,
+    которую сбрасывают сигналы при изменении записей, и не реже раза
+    в REFERENCE_CACHE_MAX_AGE секунд. Если при таком перечитывании
+    данные изменились без смены версии (запись из другого процесса при
+    кэше, не общем для процессов), версия сбрасывается здесь.
+    """
+
+    def __init__(self, model, version_name):
+        self.model = model
+        self.version_name = version_name
+        self._state = (None, None, None)
+
+    def __deepcopy__(self, memo):
+        """Поля сериализаторов копируются вместе с аргументами.
+
+        Справочник общий для процесса: копия начиналась бы пустой
+        и перечитывала таблицу при каждой записи рецепта.
+        """
+        return self
+
+    def snapshot(self, objects):
+        fields = self.model._meta.concrete_fields
+        return {
+            pk: tuple(getattr(obj, field.attname) for field in fields)
+            for pk, obj in objects.items()
+        }
+
+    def load(self):
+        version = get_version(self.version_name)
+        state_version, objects, loaded = self._state
+        if (
+            objects is None
+            or state_version != version
+            or monotonic() - loaded > settings.REFERENCE_CACHE_MAX_AGE
+        ):
+            fresh = {obj.pk: obj for obj in self.model.objects.all()}
+            if (
+                objects is not None
+                and state_version == version
+                and self.snapshot(fresh) != self.snapshot(objects)
+            ):
+                for name in (RECIPES_CACHE_VERSION, self.version_name):
+                    bump_version(name)
+                version = get_version(self.version_name)
+            objects = fresh
+            self._state = (version, objects, monotonic())
+        return version, objects
+
+    @property
+    def version(self):
+        return self.load()[0]
+
+    def all(self):
+        return list(self.load()[1].values())
+
+    def get(self, pk):
+        return self.get_many((pk,)).get(pk)
+
+    def get_many(self, pks):
+        """Объекты по ключам; отсутствующие в памяти ищутся одним запросом.
+
+        Если в базе нашлись записи, которых нет в памяти, справочник устарел
+        и будет перечитан при следующем обращении.
+        """
+        objects = self.load()[1]
+        found = {pk: objects[pk] for pk in pks if pk in objects}
+        missing = set(pks) - found.keys()
+        if missing:
+            fetched = self.model.objects.in_bulk(missing)
+            if fetched:
+                self._state = (None, None, None)
+                found.update(fetched)
+        return found
+
+
+tags = ReferenceTable(Tag, TAGS_VERSION)
+ingredients = ReferenceTable(Ingredient, INGREDIENTS_VERSION)
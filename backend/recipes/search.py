@@ -0,0 +1,57 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+WORDS = re.compile(r'\w+')
+
+POSTGRES_QUERY = (
+    "(websearch_to_tsquery('russian', %s) "
+    "|| websearch_to_tsquery('simple', %s))"
+)
+POSTGRES_MATCH = f'recipes_recipe.search_vector @@ {POSTGRES_QUERY}'
+POSTGRES_RANK = f'ts_rank(recipes_recipe.search_vector, {POSTGRES_QUERY})'
+SQLITE_MATCH = (
+    'recipes_recipe.id IN (SELECT rowid FROM recipes_recipe_fts '
+    'WHERE recipes_recipe_fts MATCH %s)'
+)
+SQLITE_RANK = (
+    '(SELECT -bm25(recipes_recipe_fts, 10.0, 5.0, 1.0) '
+    'FROM recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s '
+    'AND rowid = recipes_recipe.id)'
+)
+
+
+def fts5_query(words):
+    """Слова запроса в кавычках, чтобы синтаксис FTS5 не срабатывал."""
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def search_recipes(queryset, query):
+    """Полнотекстовый поиск по названию, ингредиентам и описанию.
+
+    PostgreSQL использует столбец search_vector с GIN-индексом
+    (конфигурации russian и simple), SQLite — таблицу FTS5; оба
+    поддерживаются триггерами. Результаты упорядочены по релевантности.
+    """
+    words = WORDS.findall(query)
+    if not words:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        params = (query, query)
+        match, rank = POSTGRES_MATCH, POSTGRES_RANK
+    elif vendor == 'sqlite':
+        params = (fts5_query(words),)
+        match, rank = SQLITE_MATCH, SQLITE_RANK
+    else:
+        condition = Q()
+        for word in words:
+            condition &= Q(name__icontains=word) | Q(text__icontains=word)
+        return queryset.filter(condition)
+    return queryset.filter(
+        RawSQL(match, params, output_field=BooleanField())
+    ).annotate(
+        search_rank=RawSQL(rank, params, output_field=FloatField())
+    ).order_by('-search_rank', '-pub_date')
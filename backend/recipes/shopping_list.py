@@ -0,0 +1,151 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from recipes.models import IngredientRecipe, ShoppingCart, ShoppingListItem
+from users.models import User
+
+BATCH_SIZE = 1000
+
+_batch = threading.local()
+
+
+def calculate_totals(users=None, ingredients=None):
+    """Суммы ингредиентов по рецептам из списков покупок."""
+    if users is None:
+        rows = IngredientRecipe.objects.filter(
+            recipe__shoppingcart_recipe__isnull=False
+        )
+    else:
+        rows = IngredientRecipe.objects.filter(
+            recipe__shoppingcart_recipe__user__in=users
+        )
+    if ingredients is not None:
+        rows = rows.filter(name__in=ingredients)
+    return {
+        (row['recipe__shoppingcart_recipe__user'], row['name']): row['total']
+        for row in rows.values(
+            'recipe__shoppingcart_recipe__user', 'name'
+        ).annotate(total=Sum('amount')).order_by()
+    }
+
+
+def refresh_shopping_list(users, ingredients=None):
+    """Пересчитывает только затронутые строки списков покупок.
+
+    Строки пользователей блокируются до конца транзакции, поэтому
+    параллельные добавления в корзину пересчитывают суммы по очереди.
+    Новые строки вставляются с обновлением при конфликте на случай баз
+    без блокировок строк.
+    """
+    if ingredients is not None and not ingredients:
+        return
+    users = sorted(set(users))
+    if not users:
+        return
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            list(User.objects.select_for_update().filter(
+                pk__in=users
+            ).order_by('pk').values_list('pk', flat=True))
+        totals = calculate_totals(users, ingredients)
+        items = ShoppingListItem.objects.filter(user__in=users)
+        if ingredients is not None:
+            items = items.filter(ingredient__in=ingredients)
+        changed, stale = [], []
+        for item in items:
+            amount = totals.pop((item.user_id, item.ingredient_id), None)
+            if amount is None:
+                stale.append(item.pk)
+            elif amount != item.amount:
+                item.amount = amount
+                changed.append(item)
+        if stale:
+            ShoppingListItem.objects.filter(pk__in=stale).delete()
+        if changed:
+            ShoppingListItem.objects.bulk_update(changed, ('amount',))
+        if totals:
+            ShoppingListItem.objects.bulk_create(
+                (
+                    ShoppingListItem(
+                        user_id=user, ingredient_id=ingredient, amount=amount
+                    )
+                    for (user, ingredient), amount in totals.items()
+                ),
+                update_conflicts=True,
+                unique_fields=('user', 'ingredient'),
+                update_fields=('amount',),
+            )
+
+
+def refresh_recipe_in_shopping_lists(recipe, ingredients):
+    """Обновляет списки покупок пользователей, добавивших рецепт.
+
+    Внутри batch_recipe_refreshes пересчет откладывается до выхода
+    из блока и объединяется с другими пересчетами того же рецепта.
+    """
+    pending = getattr(_batch, 'recipes', None)
+    if pending is not None:
+        pk = getattr(recipe, 'pk', recipe)
+        if ingredients is None or pending.get(pk, ()) is None:
+            pending[pk] = None
+        else:
+            pending[pk] = {*pending.get(pk, ()), *ingredients}
+        return
+    users = ShoppingCart.objects.filter(
+        recipe=recipe
+    ).values_list('user', flat=True)
+    refresh_shopping_list(users, ingredients)
+
+
+@contextmanager
+def batch_recipe_refreshes():
+    """Один пересчет списков покупок на рецепт за весь блок.
+
+    Нужен при изменении многих строк ингредиентов рецепта: сигналы
+    post_delete каждой строки копят ингредиенты, а пересчет выполняется
+    один раз при выходе из блока, в той же транзакции.
+    """
+    if getattr(_batch, 'recipes', None) is not None:
+        yield
+        return
+    _batch.recipes = pending = {}
+    try:
+        yield
+    finally:
+        _batch.recipes = None
+    for recipe, ingredients in pending.items():
+        refresh_recipe_in_shopping_lists(recipe, ingredients)
+
+
+def rebuild_shopping_lists():
+    """Полностью пересобирает списки покупок всех пользователей."""
+    ShoppingListItem.objects.all().delete()
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user, ingredient_id=ingredient, amount=amount
+            )
+            for (user, ingredient), amount in calculate_totals().items()
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+def find_drift():
+    """Расхождения между списками покупок и исходными данными."""
+    totals = calculate_totals()
+    drift = []
+    for user, ingredient, amount in ShoppingListItem.objects.values_list(
+        'user', 'ingredient', 'amount'
+    ).iterator():
+        expected = totals.pop((user, ingredient), None)
+        if expected != amount:
+            drift.append((user, ingredient, amount, expected))
+    drift.extend(
+        (user, ingredient, None, amount)
+        for (user, ingredient), amount in totals.items()
+    )
+    return drift
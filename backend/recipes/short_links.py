@@ -0,0 +1,82 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import get_version
+from core.constants import (
+    RECIPE_VERSION,
+    SHORT_LINK_ALPHABET,
+    SHORT_LINK_CACHE_SIZE,
+    SHORT_LINK_EXISTS_PREFIX,
+    SHORT_LINK_LEGACY_SEPARATOR,
+    SHORT_LINK_MAX_ID,
+    SHORT_LINK_MAX_LENGTH,
+)
+from recipes.models import Recipe
+
+BASE = len(SHORT_LINK_ALPHABET)
+DIGITS = {char: value for value, char in enumerate(SHORT_LINK_ALPHABET)}
+
+
+def encode_id(pk):
+    """Код короткой ссылки: id рецепта в base62, коллизии исключены."""
+    code = ''
+    while True:
+        pk, digit = divmod(pk, BASE)
+        code = SHORT_LINK_ALPHABET[digit] + code
+        if not pk:
+            return code
+
+
+def decode_code(code):
+    """Id рецепта по коду base62 или None для некорректного кода."""
+    if len(code) > SHORT_LINK_MAX_LENGTH or code[0] == '0':
+        return None
+    pk = 0
+    for char in code:
+        if char not in DIGITS:
+            return None
+        pk = pk * BASE + DIGITS[char]
+    return pk if pk <= SHORT_LINK_MAX_ID else None
+
+
+@lru_cache(maxsize=SHORT_LINK_CACHE_SIZE)
+def find_legacy_recipe(code):
+    """Id рецепта по прежнему коду из uuid4; промахи тоже кэшируются."""
+    return Recipe.objects.filter(
+        short_link=code
+    ).values_list('pk', flat=True).first()
+
+
+def recipe_exists(pk):
+    """Есть ли рецепт; ответ кэшируется до смены версии рецепта.
+
+    Версию рецепта сигналы сбрасывают и при его создании, и при удалении.
+    """
+    key = ':'.join(str(part) for part in (
+        SHORT_LINK_EXISTS_PREFIX,
+        pk,
+        get_version(RECIPE_VERSION.format(pk)),
+    ))
+    exists = cache.get(key)
+    if exists is None:
+        exists = Recipe.objects.filter(pk=pk).exists()
+        cache.set(key, exists, settings.RECIPES_CACHE_TIMEOUT)
+    return exists
+
+
+def resolve_short_link(code):
+    """Id существующего рецепта по коду короткой ссылки.
+
+    Коды base62 декодируются без запросов к БД; прежние коды
+    всегда содержат дефис и ищутся через ограниченный LRU-кэш.
+    Наличие рецепта проверяется по кэшу, сбрасываемому его версией.
+    """
+    if SHORT_LINK_LEGACY_SEPARATOR in code:
+        pk = find_legacy_recipe(code)
+    else:
+        pk = decode_code(code)
+    if pk is None or not recipe_exists(pk):
+        return None
+    return pk
@@ -0,0 +1,244 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.cache import bump_version
+from core.constants import (
+    INGREDIENTS_VERSION,
+    RECIPE_COUNTERS_VERSION,
+    RECIPE_VERSION,
+    RECIPES_CACHE_VERSION,
+    TAGS_VERSION,
+    USER_VERSION,
+    VIEWER_VERSION,
+)
+from recipes.counters import COUNTERS, change_counter
+from recipes.images import (
+    IMAGE_KINDS,
+    TARGETS,
+    rendition_files,
+    sync_renditions,
+)
+from recipes.media import acquire_files, release_files
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.shopping_list import (
+    refresh_recipe_in_shopping_lists,
+    refresh_shopping_list,
+)
+from recipes.versions import touch_recipes, touch_recipes_of
+from users.models import Subscription, User
+
+
+def invalidate(*names):
+    """Сбрасывает версии кэша после фиксации транзакции."""
+    def bump():
+        for name in (RECIPES_CACHE_VERSION, *names):
+            bump_version(name)
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate(RECIPE_VERSION.format(instance.pk))
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def ingredient_recipe_changed(sender, instance, **kwargs):
+    invalidate(RECIPE_VERSION.format(instance.recipe_id))
+    touch_recipes((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if reverse and action == 'pre_clear':
+        touch_recipes_of(**{
+            'tags' if sender is Recipe.tags.through else 'ingredients':
+            instance
+        })
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate(RECIPE_VERSION.format(instance.pk))
+        touch_recipes((instance.pk,))
+    elif pk_set:
+        invalidate(*(RECIPE_VERSION.format(pk) for pk in pk_set))
+        touch_recipes(pk_set)
+    elif sender is Recipe.tags.through:
+        invalidate(TAGS_VERSION)
+    else:
+        invalidate(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    invalidate(INGREDIENTS_VERSION)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes_of(ingredients=instance)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    invalidate(TAGS_VERSION)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_saved(sender, instance, created=False, **kwargs):
+    if not created:
+        touch_recipes_of(tags=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    invalidate(USER_VERSION.format(instance.pk))
+    if kwargs.get('created') is False:
+        touch_recipes_of(author=instance)
+
+
+def viewer_changed(sender, instance, **kwargs):
+    """Избранное, список покупок и подписки меняют ответы для читателя."""
+    transaction.on_commit(
+        lambda: bump_version(VIEWER_VERSION.format(instance.user_id))
+    )
+
+
+for model in (Favorite, ShoppingCart, Subscription):
+    post_save.connect(viewer_changed, sender=model)
+    post_delete.connect(viewer_changed, sender=model)
+
+
+def get_recipe_ingredients(recipe):
+    return list(IngredientRecipe.objects.filter(
+        recipe=recipe
+    ).values_list('name', flat=True))
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(sender, instance, created, **kwargs):
+    refresh_shopping_list(
+        (instance.user_id,),
+        get_recipe_ingredients(instance.recipe_id) if created else None
+    )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    refresh_shopping_list(
+        (instance.user_id,), get_recipe_ingredients(instance.recipe_id)
+    )
+
+
+@receiver(post_save, sender=IngredientRecipe)
+def ingredient_recipe_saved(sender, instance, created, **kwargs):
+    refresh_recipe_in_shopping_lists(
+        instance.recipe_id, (instance.name_id,) if created else None
+    )
+
+
+@receiver(post_delete, sender=IngredientRecipe)
+def ingredient_recipe_deleted(sender, instance, **kwargs):
+    refresh_recipe_in_shopping_lists(instance.recipe_id, (instance.name_id,))
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    instance.shopping_list_scope = (
+        list(ShoppingCart.objects.filter(
+            recipe=instance
+        ).values_list('user', flat=True)),
+        get_recipe_ingredients(instance),
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    users, ingredients = getattr(instance, 'shopping_list_scope', ((), ()))
+    refresh_shopping_list(users, ingredients)
+
+
+def counted_saved(sender, instance, created, **kwargs):
+    if created:
+        update_counters(sender, instance, 1)
+
+
+def counted_deleted(sender, instance, **kwargs):
+    update_counters(sender, instance, -1)
+
+
+def update_counters(sender, instance, delta):
+    for model, field, source, source_field in COUNTERS:
+        if source is sender:
+            change_counter(
+                model, getattr(instance, f'{source_field}_id'), field, delta
+            )
+            if model is Recipe:
+                transaction.on_commit(
+                    lambda: bump_version(RECIPE_COUNTERS_VERSION)
+                )
+
+
+for _, _, source, _ in COUNTERS:
+    post_save.connect(counted_saved, sender=source)
+    post_delete.connect(counted_deleted, sender=source)
+
+
+def remember_image(sender, instance, **kwargs):
+    field = TARGETS[IMAGE_KINDS[sender]][1]
+    if field in instance.__dict__:
+        value = instance.__dict__[field]
+        instance.stored_image = value if isinstance(value, str) else ''
+
+
+def image_saved(sender, instance, update_fields=None, **kwargs):
+    kind = IMAGE_KINDS[sender]
+    field = TARGETS[kind][1]
+    if update_fields and field not in update_fields:
+        return
+    if not hasattr(instance, 'stored_image'):
+        return
+    name = getattr(instance, field).name or ''
+    if name != instance.stored_image:
+        acquire_files((name,))
+        release_files((instance.stored_image,))
+        instance.stored_image = name
+    sync_renditions(kind, instance)
+
+
+def image_deleted(sender, instance, **kwargs):
+    renditions_field = TARGETS[IMAGE_KINDS[sender]][2]
+    release_files({
+        getattr(instance, 'stored_image', ''),
+        *rendition_files(instance.__dict__.get(renditions_field) or {}),
+    })
+
+
+for model in IMAGE_KINDS:
+    post_init.connect(remember_image, sender=model)
+    post_save.connect(image_saved, sender=model)
+    post_delete.connect(image_deleted, sender=model)
@@ -0,0 +1,371 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from random import Random
+from unittest import mock
+
+from django.contrib import admin
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.admin import FixedOwnerAdmin
+from core.constants import IMAGE_TASK_MAX_ATTEMPTS, IMAGE_TASK_STALE_SECONDS
+from recipes import images
+from recipes.generator import create_links
+from recipes.media import acquire_files, release_files
+from recipes.models import (
+    Favorite,
+    ImageTask,
+    Ingredient,
+    IngredientRecipe,
+    MediaFile,
+    Recipe,
+    ShoppingCart,
+    ShoppingListItem,
+    Tag,
+)
+from users.models import Subscription, User
+
+
+class ShoppingListTest(TestCase):
+    """Суммы списка покупок при параллельных изменениях корзины."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cook@example.com',
+            username='cook',
+            first_name='cook',
+            last_name='cook',
+            password='Secret-password-1',
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='картофель', measurement_unit='г'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name='Пюре',
+            text='Текст',
+            cooking_time=10,
+            image='recipes/images/test.png',
+        )
+        IngredientRecipe.objects.create(
+            recipe=cls.recipe, name=cls.ingredient, amount=300
+        )
+
+    def test_concurrent_insert_is_updated(self):
+        bulk_create = ShoppingListItem.objects.bulk_create
+
+        def concurrent_bulk_create(*args, **kwargs):
+            ShoppingListItem.objects.create(
+                user=self.user, ingredient=self.ingredient, amount=1
+            )
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(
+            ShoppingListItem.objects, 'bulk_create', concurrent_bulk_create
+        ):
+            ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(
+            list(ShoppingListItem.objects.values_list(
+                'user', 'ingredient', 'amount'
+            )),
+            [(self.user.pk, self.ingredient.pk, 300)],
+        )
+
+
+@mock.patch.object(images, 'connection')
+class ImageTaskTest(TestCase):
+    """Задачи обработки изображений не зависают при любых ошибках."""
+
+    def create_task(self, status=ImageTask.PROCESSING, attempts=1):
+        return ImageTask.objects.create(
+            kind=ImageTask.RECIPE,
+            object_id=1,
+            source='recipes/images/test.png',
+            status=status,
+            attempts=attempts,
+        )
+
+    def process_failing(self, task):
+        with mock.patch.object(
+            images, 'make_renditions', side_effect=RuntimeError('сбой')
+        ), self.assertLogs('foodgram.images', 'ERROR'):
+            self.assertFalse(images.process_task(task.pk))
+        task.refresh_from_db()
+        return task
+
+    def test_unexpected_error_returns_task_to_queue(self, connection):
+        task = self.process_failing(self.create_task())
+        self.assertEqual(task.status, ImageTask.PENDING)
+        self.assertEqual(task.error, 'RuntimeError: сбой')
+
+    def test_last_attempt_marks_task_failed(self, connection):
+        task = self.process_failing(
+            self.create_task(attempts=IMAGE_TASK_MAX_ATTEMPTS)
+        )
+        self.assertEqual(task.status, ImageTask.FAILED)
+
+    def test_stale_task_without_attempts_is_failed(self, connection):
+        task = self.create_task(attempts=IMAGE_TASK_MAX_ATTEMPTS)
+        ImageTask.objects.filter(pk=task.pk).update(
+            updated=timezone.now()
+            - timedelta(seconds=IMAGE_TASK_STALE_SECONDS + 1)
+        )
+        self.assertEqual(images.claim_tasks(10), [])
+        task.refresh_from_db()
+        self.assertEqual(task.status, ImageTask.FAILED)
+
+
+class MediaFileTest(TestCase):
+    """Хранение файлов по содержимому и подсчет ссылок на них."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.name = default_storage.save(
+            'recipes/images/photo.png', ContentFile(b'image')
+        )
+
+    def references(self):
+        return MediaFile.objects.filter(
+            name=self.name
+        ).values_list('references', flat=True).first()
+
+    def test_same_content_is_stored_once(self):
+        self.assertEqual(
+            default_storage.save(
+                'users/other.PNG', ContentFile(b'image')
+            ).rsplit('/', 1)[-1],
+            self.name.rsplit('/', 1)[-1],
+        )
+        self.assertEqual(
+            default_storage.save(
+                'recipes/images/copy.png', ContentFile(b'image')
+            ),
+            self.name,
+        )
+        self.assertNotEqual(
+            default_storage.save(
+                'recipes/images/photo.png', ContentFile(b'other')
+            ),
+            self.name,
+        )
+
+    def test_file_is_deleted_with_last_reference(self):
+        acquire_files((self.name,))
+        acquire_files((self.name, ''), count=2)
+        self.assertEqual(self.references(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            release_files((self.name,))
+            release_files((self.name,))
+        self.assertEqual(self.references(), 1)
+        self.assertTrue(default_storage.exists(self.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            release_files((self.name,))
+        self.assertIsNone(self.references())
+        self.assertFalse(default_storage.exists(self.name))
+
+    def test_new_reference_before_deletion_keeps_file(self):
+        acquire_files((self.name,))
+        with self.captureOnCommitCallbacks() as callbacks:
+            release_files((self.name,))
+        self.assertEqual(self.references(), 0)
+        # Загрузка того же содержимого успела сослаться на файл
+        # до выполнения отложенного удаления.
+        self.assertEqual(
+            default_storage.save(
+                'recipes/images/again.png', ContentFile(b'image')
+            ),
+            self.name,
+        )
+        acquire_files((self.name,))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.references(), 1)
+        self.assertTrue(default_storage.exists(self.name))
+
+    def test_release_without_reference(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            release_files((self.name,))
+        self.assertIsNone(self.references())
+        self.assertTrue(default_storage.exists(self.name))
+
+
+class FixedOwnerAdminTest(TestCase):
+    """В админке нельзя перенести запись к другому владельцу."""
+
+    def test_owner_fields_are_read_only_on_change(self):
+        for model, fields in (
+            (Recipe, {'author'}),
+            (IngredientRecipe, {'recipe'}),
+            (Favorite, {'user', 'recipe'}),
+            (ShoppingCart, {'user', 'recipe'}),
+            (Subscription, {'user', 'following'}),
+        ):
+            with self.subTest(model=model.__name__):
+                model_admin = admin.site._registry[model]
+                self.assertIsInstance(model_admin, FixedOwnerAdmin)
+                self.assertFalse(fields & set(model_admin.list_editable))
+                self.assertFalse(
+                    fields & set(model_admin.get_readonly_fields(None))
+                )
+                self.assertLessEqual(
+                    fields,
+                    set(model_admin.get_readonly_fields(None, model())),
+                )
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Данные до миграции и их вид после нее."""
+
+    users_migration = '0003_user_counters'
+
+    def migrate(self, recipes_migration):
+        targets = [
+            ('recipes', recipes_migration),
+            ('users', self.users_migration),
+        ]
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def create_recipe(self, apps):
+        user = apps.get_model('users', 'User').objects.create(
+            email='cook@example.com', username='cook'
+        )
+        return user, apps.get_model('recipes', 'Recipe').objects.create(
+            author=user,
+            name='Пюре',
+            text='Текст',
+            cooking_time=10,
+            image='recipes/images/test.png',
+        )
+
+
+class FillCreatedMigrationTest(MigrationTestCase):
+    """Прежние добавления в избранное и корзину получают дату рецепта."""
+
+    def test_created_is_recipe_pub_date(self):
+        apps = self.migrate('0003_recipe_counters')
+        Recipe = apps.get_model('recipes', 'Recipe')
+        user, recipe = self.create_recipe(apps)
+        published = timezone.now() - timedelta(days=30)
+        Recipe.objects.filter(pk=recipe.pk).update(pub_date=published)
+        for name in ('Favorite', 'ShoppingCart'):
+            apps.get_model('recipes', name).objects.create(
+                user=user, recipe=recipe
+            )
+        apps = self.migrate('0004_recipe_ordering_indexes')
+        for name in ('Favorite', 'ShoppingCart'):
+            with self.subTest(model=name):
+                self.assertEqual(
+                    list(apps.get_model('recipes', name).objects.values_list(
+                        'created', flat=True
+                    )),
+                    [published],
+                )
+
+
+class UniqueLinksMigrationTest(MigrationTestCase):
+    """Повторы в избранном и корзине удаляются вместе с их счетом."""
+
+    users_migration = '0004_user_avatar_renditions'
+
+    def test_duplicates_are_removed(self):
+        apps = self.migrate('0013_recipe_tags_tag_recipe_idx')
+        user, recipe = self.create_recipe(apps)
+        for name in ('Favorite', 'ShoppingCart'):
+            for _ in range(3):
+                apps.get_model('recipes', name).objects.create(
+                    user=user, recipe=recipe
+                )
+        apps = self.migrate('0014_favorite_shoppingcart_unique')
+        for name in ('Favorite', 'ShoppingCart'):
+            with self.subTest(model=name):
+                self.assertEqual(
+                    apps.get_model('recipes', name).objects.count(), 1
+                )
+        self.assertEqual(
+            apps.get_model('recipes', 'Recipe').objects.values_list(
+                'favorites_count', 'in_carts_count'
+            ).get(),
+            (1, 1),
+        )
+
+
+class SyntheticDataTest(TestCase):
+    """Генерация синтетических данных и прогон нагрузочных сценариев."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'продукт {number}', measurement_unit='г')
+            for number in range(5)
+        )
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def generate(self):
+        output = StringIO()
+        call_command(
+            'generate_data',
+            users=4,
+            recipes_per_user=2,
+            ingredients_per_recipe=2,
+            favorites_per_user=3,
+            carts_per_user=1,
+            subscriptions_per_user=2,
+            seed=1,
+            stdout=output,
+        )
+        return output.getvalue()
+
+    def test_links_count_only_created_rows(self):
+        self.assertIn('Избранное: создано 12', self.generate())
+        Favorite.objects.all().delete()
+        users = list(User.objects.values_list('pk', flat=True))
+        recipes = list(Recipe.objects.values_list('pk', flat=True))[:1]
+        for created in (len(users), 0):
+            self.assertEqual(
+                create_links(
+                    Random(1), Favorite, 'recipe', users, recipes, 1, 100
+                ),
+                created,
+            )
+
+    @override_settings(ALLOWED_HOSTS=[])
+    def test_benchmark_default_host(self):
+        self.generate()
+        output = StringIO()
+        call_command(
+            'benchmark',
+            iterations=1,
+            warmup=0,
+            alloc_iterations=0,
+            only=['recipe_list_anonymous', 'recipe_list'],
+            stdout=output,
+        )
+        rows = output.getvalue().splitlines()[1:]
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertEqual(row.split()[1], '200')
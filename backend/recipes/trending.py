@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import bump_version
+from core.constants import (
+    RECIPES_CACHE_VERSION,
+    TRENDING_FAVORITE_WEIGHT,
+    TRENDING_HALF_LIFE_HOURS,
+    TRENDING_SHOPPING_CART_WEIGHT,
+    TRENDING_WINDOW_DAYS,
+)
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+BATCH_SIZE = 1000
+
+
+def calculate_trending_scores(half_life_hours=TRENDING_HALF_LIFE_HOURS,
+                              window_days=TRENDING_WINDOW_DAYS):
+    """Затухающий во времени рейтинг по избранному и спискам покупок."""
+    now = timezone.now()
+    half_life = timedelta(hours=half_life_hours)
+    scores = {}
+    for model, weight in (
+        (Favorite, TRENDING_FAVORITE_WEIGHT),
+        (ShoppingCart, TRENDING_SHOPPING_CART_WEIGHT),
+    ):
+        events = model.objects.filter(
+            created__gte=now - timedelta(days=window_days)
+        ).values_list('recipe', 'created')
+        for recipe, created in events.iterator():
+            scores[recipe] = (
+                scores.get(recipe, 0)
+                + weight * 0.5 ** ((now - created) / half_life)
+            )
+    return scores
+
+
+def update_trending_scores(**kwargs):
+    """Сохраняет рейтинг, обновляя только изменившиеся рецепты."""
+    scores = calculate_trending_scores(**kwargs)
+    Recipe.objects.exclude(
+        pk__in=scores
+    ).exclude(
+        trending_score=0
+    ).update(trending_score=0)
+    recipes = list(Recipe.objects.filter(pk__in=scores).only('trending_score'))
+    for recipe in recipes:
+        recipe.trending_score = scores[recipe.pk]
+    Recipe.objects.bulk_update(
+        recipes, ('trending_score',), batch_size=BATCH_SIZE
+    )
+    transaction.on_commit(lambda: bump_version(RECIPES_CACHE_VERSION))
+    return len(recipes)
@@ -0,0 +1,42 @@
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.cache import bump_version
+from core.constants import RECIPE_VERSION, RECIPES_CACHE_VERSION
+from recipes.models import Recipe
+
+_pending = threading.local()
+
+
+def touch_recipes(pks):
+    """Повышает версию и дату изменения рецептов после фиксации.
+
+    Рецепты копятся до фиксации транзакции, поэтому изменение
+    нескольких связанных строк рецепта дает один UPDATE.
+    """
+    pending = getattr(_pending, 'pks', None)
+    if pending is None:
+        pending = _pending.pks = set()
+    pending.update(pks)
+    transaction.on_commit(flush_touched_recipes)
+
+
+def touch_recipes_of(**filters):
+    touch_recipes(Recipe.objects.filter(
+        **filters
+    ).values_list('pk', flat=True))
+
+
+def flush_touched_recipes():
+    pks = getattr(_pending, 'pks', None)
+    if not pks:
+        return
+    _pending.pks = set()
+    Recipe.objects.filter(pk__in=pks).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    for name in (RECIPES_CACHE_VERSION, *map(RECIPE_VERSION.format, pks)):
+        bump_version(name)
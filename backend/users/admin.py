@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from core.admin import FixedOwnerAdmin
 from users.models import Subscription, User
 
 
@@ -26,14 +27,15 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ('email', 'username',)
 
     def recipe_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     recipe_count.short_description = 'Количество рецептов'
+    recipe_count.admin_order_field = 'recipes_count'
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(FixedOwnerAdmin):
     """Админ панель для модели подписок."""
 
     list_display = ('id', 'user', 'following')
-    list_editable = ('user', 'following')
+    owner_fields = ('user', 'following')